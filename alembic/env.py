@@ -7,7 +7,7 @@ from alembic import context
 
 import models
 from sqlalchemy import create_engine
-from config import SYNC_DATABASE_URL
+from config import SHARD_SYNC_DATABASE_URLS
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -67,7 +67,12 @@ def run_migrations_online() -> None:
     #     poolclass=pool.NullPool,
     # )
 
-    connectable = create_engine(SYNC_DATABASE_URL)
+    url = config.attributes.get("url")
+    if url is None:
+        shard = int(context.get_x_argument(as_dictionary=True).get("shard", 0))
+        url = SHARD_SYNC_DATABASE_URLS[shard]
+
+    connectable = create_engine(url)
     
     with connectable.connect() as connection:
         context.configure(
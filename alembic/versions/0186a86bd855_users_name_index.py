@@ -0,0 +1,31 @@
+"""users name index
+
+Revision ID: 0186a86bd855
+Revises: c4de56c08793
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0186a86bd855'
+down_revision: Union[str, Sequence[str], None] = 'c4de56c08793'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_name', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.create_index('ix_users_name', 'users', ['name'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_name', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""shard social accounts directory
+
+Revision ID: 3f9c2d7a41e8
+Revises: 6e767c5eef17
+Create Date: 2026-10-18 23:55:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a41e8'
+down_revision: Union[str, Sequence[str], None] = '6e767c5eef17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('social_accounts_user_id_fkey', 'social_accounts', type_='foreignkey')
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_social_accounts_user_id'), table_name='social_accounts', postgresql_concurrently=True, if_exists=True)
+        op.create_index(op.f('ix_social_accounts_user_id'), 'social_accounts', ['user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_social_accounts_user_id'), table_name='social_accounts', postgresql_concurrently=True)
+    op.create_foreign_key('social_accounts_user_id_fkey', 'social_accounts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
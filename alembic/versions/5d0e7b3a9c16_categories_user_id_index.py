@@ -0,0 +1,31 @@
+"""categories user_id index
+
+Revision ID: 5d0e7b3a9c16
+Revises: 8c21f5e0b7d4
+Create Date: 2026-10-19 02:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0e7b3a9c16'
+down_revision: Union[str, Sequence[str], None] = '8c21f5e0b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_categories_user_id', table_name='categories', postgresql_concurrently=True, if_exists=True)
+        op.create_index('ix_categories_user_id', 'categories', ['user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_categories_user_id', table_name='categories', postgresql_concurrently=True)
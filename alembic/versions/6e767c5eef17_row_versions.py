@@ -0,0 +1,32 @@
+"""row versions
+
+Revision ID: 6e767c5eef17
+Revises: b1975402cad5
+Create Date: 2026-10-18 22:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e767c5eef17'
+down_revision: Union[str, Sequence[str], None] = 'b1975402cad5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('categories', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('workoutdata', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workoutdata', 'version')
+    op.drop_column('categories', 'version')
+    op.drop_column('users', 'version')
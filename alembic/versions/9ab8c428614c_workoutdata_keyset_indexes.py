@@ -0,0 +1,30 @@
+"""workoutdata keyset indexes
+
+Revision ID: 9ab8c428614c
+Revises: a734ffd07d0f
+Create Date: 2026-10-18 20:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ab8c428614c'
+down_revision: Union[str, Sequence[str], None] = 'a734ffd07d0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_workoutdata_user_id_time_id', 'workoutdata', ['user_id', 'time', 'id'], unique=False)
+    op.create_index('ix_workoutdata_category_id_time_id', 'workoutdata', ['category_id', 'time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workoutdata_category_id_time_id', table_name='workoutdata')
+    op.drop_index('ix_workoutdata_user_id_time_id', table_name='workoutdata')
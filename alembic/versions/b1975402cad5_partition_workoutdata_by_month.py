@@ -0,0 +1,101 @@
+"""partition workoutdata by month
+
+Revision ID: b1975402cad5
+Revises: 0186a86bd855
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1975402cad5'
+down_revision: Union[str, Sequence[str], None] = '0186a86bd855'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+COLUMNS = 'id, user_id, category_id, quantity, "time"'
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def rename_plain_table(name: str) -> None:
+    op.rename_table('workoutdata', name)
+    for index in ('workoutdata_pkey', 'ix_workoutdata_user_id_time_id', 'ix_workoutdata_category_id_time_id'):
+        op.execute(f'ALTER INDEX {index} RENAME TO {index.replace("workoutdata", name, 1)}')
+    for constraint in ('workoutdata_user_id_fkey', 'workoutdata_category_id_fkey'):
+        op.execute(f'ALTER TABLE {name} RENAME CONSTRAINT {constraint} TO {constraint.replace("workoutdata", name, 1)}')
+
+
+def create_indexes() -> None:
+    op.create_index('ix_workoutdata_user_id_time_id', 'workoutdata', ['user_id', 'time', 'id'], unique=False)
+    op.create_index('ix_workoutdata_category_id_time_id', 'workoutdata', ['category_id', 'time', 'id'], unique=False)
+
+
+def move_rows(source: str) -> None:
+    op.execute(f'INSERT INTO workoutdata ({COLUMNS}) SELECT {COLUMNS} FROM {source}')
+    op.execute('ALTER SEQUENCE workoutdata_id_seq OWNED BY workoutdata.id')
+    op.drop_table(source)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rename_plain_table('workoutdata_plain')
+    op.execute(
+        """
+        CREATE TABLE workoutdata (
+            id BIGINT NOT NULL DEFAULT nextval('workoutdata_id_seq'),
+            user_id BIGINT NOT NULL
+                CONSTRAINT workoutdata_user_id_fkey REFERENCES users (id) ON DELETE CASCADE,
+            category_id BIGINT NOT NULL
+                CONSTRAINT workoutdata_category_id_fkey REFERENCES categories (id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL,
+            "time" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT workoutdata_pkey PRIMARY KEY (id, "time")
+        ) PARTITION BY RANGE ("time")
+        """
+    )
+    create_indexes()
+
+    oldest = op.get_bind().execute(sa.text('SELECT min("time") FROM workoutdata_plain')).scalar()
+    current = date.today().replace(day=1)
+    month = (oldest.date() if oldest else current).replace(day=1)
+    while month <= add_months(current, MONTHS_AHEAD):
+        upper = add_months(month, 1)
+        op.execute(
+            f'CREATE TABLE workoutdata_y{month.year}m{month.month:02d} PARTITION OF workoutdata '
+            f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+        )
+        month = upper
+    op.execute('CREATE TABLE workoutdata_default PARTITION OF workoutdata DEFAULT')
+
+    move_rows('workoutdata_plain')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    rename_plain_table('workoutdata_partitioned')
+    op.execute(
+        """
+        CREATE TABLE workoutdata (
+            user_id BIGINT NOT NULL
+                CONSTRAINT workoutdata_user_id_fkey REFERENCES users (id) ON DELETE CASCADE,
+            category_id BIGINT NOT NULL
+                CONSTRAINT workoutdata_category_id_fkey REFERENCES categories (id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL,
+            "time" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            id BIGINT NOT NULL DEFAULT nextval('workoutdata_id_seq'),
+            CONSTRAINT workoutdata_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    create_indexes()
+    move_rows('workoutdata_partitioned')
@@ -0,0 +1,56 @@
+"""workout rollups
+
+Revision ID: c4de56c08793
+Revises: 9ab8c428614c
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4de56c08793'
+down_revision: Union[str, Sequence[str], None] = '9ab8c428614c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+    op.create_table('workout_rollups',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('category_id', sa.BigInteger(), nullable=False),
+    sa.Column('granularity', sa.String(length=5), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.Column('total', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'granularity', 'bucket', 'category_id', name='uq_workout_rollup_bucket')
+    )
+    op.create_index('ix_workout_rollups_category_id', 'workout_rollups', ['category_id'], unique=False)
+    op.execute(
+        """
+        INSERT INTO workout_rollups (user_id, category_id, granularity, bucket, count, total)
+        SELECT w.user_id, w.category_id, g.granularity,
+               date_trunc(g.granularity, timezone(u.timezone, timezone('UTC', w.time)))::date,
+               count(*), sum(w.quantity)
+        FROM workoutdata w
+        JOIN users u ON u.id = w.user_id
+        CROSS JOIN (VALUES ('day'), ('week'), ('month')) AS g (granularity)
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workout_rollups_category_id', table_name='workout_rollups')
+    op.drop_table('workout_rollups')
+    op.drop_column('users', 'timezone')
@@ -0,0 +1,44 @@
+"""user names directory
+
+Revision ID: e2b4c6a8d0f1
+Revises: 5d0e7b3a9c16
+Create Date: 2026-10-19 04:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b4c6a8d0f1'
+down_revision: Union[str, Sequence[str], None] = '5d0e7b3a9c16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_names',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', name='uq_user_names_name')
+    )
+    op.create_index(op.f('ix_user_names_user_id'), 'user_names', ['user_id'], unique=False)
+    op.execute(
+        """
+        INSERT INTO user_names (name, user_id)
+        SELECT DISTINCT ON (name) name, id FROM users
+        WHERE password IS NOT NULL
+        ORDER BY name, id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_names_user_id'), table_name='user_names')
+    op.drop_table('user_names')
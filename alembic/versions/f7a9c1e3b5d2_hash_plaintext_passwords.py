@@ -0,0 +1,38 @@
+"""hash plaintext passwords
+
+Revision ID: f7a9c1e3b5d2
+Revises: e2b4c6a8d0f1
+Create Date: 2026-10-19 04:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from users.passwords import SCHEME, hash_password_sync
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a9c1e3b5d2'
+down_revision: Union[str, Sequence[str], None] = 'e2b4c6a8d0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+    plaintext = connection.execute(
+        sa.text("SELECT id, password FROM users WHERE password NOT LIKE :prefix"),
+        {"prefix": f"{SCHEME}$%"},
+    ).all()
+    if plaintext:
+        connection.execute(
+            sa.text("UPDATE users SET password = :password, version = version + 1 WHERE id = :id"),
+            [{"id": id, "password": hash_password_sync(password)} for id, password in plaintext],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
@@ -0,0 +1,87 @@
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def epoch_week(days: np.ndarray | int):
+    return (days + 3) // 7
+
+
+def compute_metrics(
+    days: np.ndarray,
+    quantities: np.ndarray,
+    category_ids: np.ndarray,
+    today: int,
+    window: int = 7,
+    series_days: int = 30,
+):
+    order = np.argsort(category_ids, kind="stable")
+    days, quantities, category_ids = days[order], quantities[order], category_ids[order]
+
+    categories, starts = np.unique(category_ids, return_index=True)
+    ends = np.append(starts[1:], len(category_ids))
+
+    return [
+        category_metrics(
+            int(category_id),
+            days[start:end],
+            quantities[start:end],
+            today,
+            window,
+            series_days,
+        )
+        for category_id, start, end in zip(categories, starts, ends)
+    ]
+
+
+def category_metrics(
+    category_id: int,
+    days: np.ndarray,
+    quantities: np.ndarray,
+    today: int,
+    window: int,
+    series_days: int,
+):
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    daily = np.bincount(inverse, weights=quantities).astype(np.int64)
+
+    horizon = series_days + window - 1
+    first = today - horizon + 1
+    recent = (unique_days >= first) & (unique_days <= today)
+    dense = np.zeros(horizon, dtype=np.int64)
+    dense[unique_days[recent] - first] = daily[recent]
+    cumulative = np.concatenate(([0], np.cumsum(dense)))
+    moving_average = (cumulative[window:] - cumulative[:-window]) / window
+
+    breaks = np.flatnonzero(np.diff(unique_days) != 1)
+    run_starts = np.concatenate(([0], breaks + 1))
+    run_ends = np.concatenate((breaks, [len(unique_days) - 1]))
+    runs = run_ends - run_starts + 1
+    current_streak = int(runs[-1]) if unique_days[-1] >= today - 1 else 0
+
+    weeks = epoch_week(unique_days)
+    this_week = epoch_week(today)
+    week_total = int(daily[weeks == this_week].sum())
+    previous_week_total = int(daily[weeks == this_week - 1].sum())
+    delta = week_total - previous_week_total
+
+    return {
+        "category_id": category_id,
+        "workouts": int(len(quantities)),
+        "total": int(quantities.sum()),
+        "personal_best": int(quantities.max()),
+        "best_day_total": int(daily.max()),
+        "percentiles": {
+            f"p{p}": float(value)
+            for p, value in zip(PERCENTILES, np.percentile(quantities, PERCENTILES))
+        },
+        "current_streak": current_streak,
+        "longest_streak": int(runs.max()),
+        "week_total": week_total,
+        "previous_week_total": previous_week_total,
+        "week_over_week_delta": delta,
+        "week_over_week_pct": (
+            round(delta / previous_week_total * 100, 2) if previous_week_total else None
+        ),
+        "moving_average": [round(float(value), 3) for value in moving_average],
+    }
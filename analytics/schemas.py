@@ -0,0 +1,26 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class CategoryAnalytics(BaseModel):
+    category_id: int
+    workouts: int
+    total: int
+    personal_best: int
+    best_day_total: int
+    percentiles: dict[str, float]
+    current_streak: int
+    longest_streak: int
+    week_total: int
+    previous_week_total: int
+    week_over_week_delta: int
+    week_over_week_pct: float | None
+    moving_average: list[float]
+
+
+class UserAnalytics(BaseModel):
+    user_id: int
+    as_of: date
+    window: int
+    categories: list[CategoryAnalytics]
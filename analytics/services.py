@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from itertools import chain
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, func, select
+
+from config import EXPORT_FETCH_SIZE
+from database import BaseRepository
+from models import User, WorkoutData
+
+from .engine import compute_metrics
+
+EPOCH = date(1970, 1, 1)
+
+
+class AnalyticsRepository(BaseRepository[WorkoutData]):
+    def __init__(self, session):
+        super().__init__(WorkoutData, session)
+
+    async def load_series(self, user_id: int):
+        local_time = func.timezone(User.timezone, func.timezone("UTC", self.model.time))
+        local_day = cast(
+            func.floor(func.extract("epoch", local_time) / 86400), BigInteger
+        )
+        query = (
+            select(local_day, self.model.quantity, self.model.category_id)
+            .join(User, User.id == self.model.user_id)
+            .where(self.model.user_id == user_id)
+            .execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+
+        chunks = []
+        result = await self.session.stream(query)
+        async for partition in result.partitions():
+            chunks.append(
+                np.fromiter(
+                    chain.from_iterable(partition), dtype=np.int64, count=3 * len(partition)
+                ).reshape(-1, 3)
+            )
+
+        columns = np.concatenate(chunks) if chunks else np.empty((0, 3), np.int64)
+        return columns[:, 0], columns[:, 1], columns[:, 2]
+
+    async def get_user_analytics(self, user_id: int, window: int, series_days: int):
+        user = await self.session.get(User, user_id)
+        if user is None:
+            return None
+
+        as_of = datetime.now(ZoneInfo(user.timezone)).date()
+        days, quantities, category_ids = await self.load_series(user_id)
+        return {
+            "user_id": user_id,
+            "as_of": as_of,
+            "window": window,
+            "categories": compute_metrics(
+                days,
+                quantities,
+                category_ids,
+                today=(as_of - EPOCH).days,
+                window=window,
+                series_days=series_days,
+            ),
+        }
@@ -0,0 +1,44 @@
+import argparse
+import time
+
+import numpy as np
+
+from analytics.engine import compute_metrics
+
+
+def synthetic_history(rows: int, categories: int, years: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    today = 20_000
+    days = today - rng.integers(0, 365 * years, rows)
+    quantities = rng.integers(1, 200, rows)
+    category_ids = rng.integers(1, categories + 1, rows)
+    return days, quantities, category_ids, today
+
+
+def main(sizes: list[int], categories: int, years: int, repeat: int):
+    print(f"{'rows':>10} {'best ms':>10} {'rows/s':>14}")
+    for size in sizes:
+        days, quantities, category_ids, today = synthetic_history(size, categories, years)
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compute_metrics(days, quantities, category_ids, today)
+            timings.append(time.perf_counter() - started)
+
+        best = min(timings)
+        print(f"{size:>10} {best * 1000:>10.1f} {size / best:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the workout analytics engine on synthetic histories."
+    )
+    parser.add_argument(
+        "sizes", nargs="*", type=int, default=[10_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.categories, args.years, args.repeat)
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import time
+
+from database import async_session
+from models import Category, User
+from workouts.services import WorkoutRepository
+
+
+async def seed_owner():
+    async with async_session() as session:
+        user = User(name="bulk-benchmark")
+        session.add(user)
+        await session.flush()
+        category = Category(user_id=user.id, name="bulk-benchmark")
+        session.add(category)
+        await session.commit()
+        return user.id, category.id
+
+
+async def single_rows(rows: list[dict]):
+    async with async_session() as session:
+        workouts_repo = WorkoutRepository(session=session)
+        for row in rows:
+            await workouts_repo.create(**row)
+
+
+async def bulk_rows(rows: list[dict]):
+    async with async_session() as session:
+        workouts_repo = WorkoutRepository(session=session)
+        await workouts_repo.create_many(rows)
+
+
+async def main(sizes: list[int]):
+    user_id, category_id = await seed_owner()
+
+    print(f"{'rows':>8} {'single rows/s':>15} {'bulk rows/s':>15} {'speedup':>8}")
+    for size in sizes:
+        rows = [
+            {"user_id": user_id, "category_id": category_id, "quantity": i}
+            for i in range(size)
+        ]
+
+        started = time.perf_counter()
+        await single_rows(rows)
+        single = size / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await bulk_rows(rows)
+        bulk = size / (time.perf_counter() - started)
+
+        print(f"{size:>8} {single:>15.0f} {bulk:>15.0f} {bulk / single:>7.1f}x")
+
+    async with async_session() as session:
+        await session.delete(await session.get(User, user_id))
+        await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare single-row and bulk workout inserts."
+    )
+    parser.add_argument("sizes", nargs="*", type=int, default=[10, 100, 1000, 5000])
+    asyncio.run(main(parser.parse_args().sizes))
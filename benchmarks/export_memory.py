@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from database import async_session
+from models import Category, User
+from workouts.export import export_columnar, export_rows
+from workouts.services import WorkoutRepository
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM is not available")
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+async def seed_history(rows: int, chunk: int = 50_000):
+    async with async_session() as session:
+        user = User(name="export-benchmark")
+        session.add(user)
+        await session.flush()
+        category = Category(user_id=user.id, name="export-benchmark")
+        session.add(category)
+        await session.commit()
+
+        workouts_repo = WorkoutRepository(session=session)
+        for start in range(0, rows, chunk):
+            await workouts_repo.create_many(
+                [
+                    {"user_id": user.id, "category_id": category.id, "quantity": i}
+                    for i in range(start, min(rows, start + chunk))
+                ]
+            )
+        return user.id
+
+
+async def drop_user(user_id: int):
+    async with async_session() as session:
+        await session.delete(await session.get(User, user_id))
+        await session.commit()
+
+
+async def export(user_id: int, format: str):
+    reset_peak_rss()
+    baseline = current_rss_mb()
+
+    started = time.perf_counter()
+    total = 0
+    if format == "columnar":
+        chunks = export_columnar(user_id=user_id)
+    else:
+        chunks = export_rows(format, user_id=user_id)
+    async for chunk in chunks:
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {"bytes": total, "seconds": elapsed, "growth": peak_rss_mb() - baseline}
+        )
+    )
+
+
+async def measure(user_id: int, format: str):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.export_memory",
+        "--export-user",
+        str(user_id),
+        "--format",
+        format,
+        stdout=asyncio.subprocess.PIPE,
+        cwd=ROOT,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(
+            f"export of user {user_id} failed with code {process.returncode}"
+        )
+    return json.loads(stdout.decode().splitlines()[-1])
+
+
+async def main(sizes: list[int], format: str, limit_mb: float):
+    failed = False
+    print(f"{'rows':>10} {'bytes':>14} {'seconds':>8} {'peak rss growth MB':>20}")
+    for size in sizes:
+        user_id = await seed_history(size)
+        try:
+            result = await measure(user_id, format)
+        finally:
+            await drop_user(user_id)
+
+        failed |= result["growth"] > limit_mb
+        print(
+            f"{size:>10} {result['bytes']:>14} {result['seconds']:>8.2f} "
+            f"{result['growth']:>20.1f}"
+        )
+
+    if failed:
+        sys.exit(f"peak RSS grew by more than {limit_mb} MB during an export")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that workout export memory stays flat as history grows."
+    )
+    parser.add_argument("sizes", nargs="*", type=int, default=[100, 100_000, 1_000_000])
+    parser.add_argument("--format", choices=["ndjson", "csv", "columnar"], default="ndjson")
+    parser.add_argument("--limit-mb", type=float, default=64)
+    parser.add_argument("--export-user", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.export_user is not None:
+        asyncio.run(export(args.export_user, args.format))
+    else:
+        asyncio.run(main(args.sizes, args.format, args.limit_mb))
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.load import percentile, prepare_database
+
+
+async def probe(client, user_id: int, duration: float, interval: float):
+    request_latencies = []
+    loop_lags = []
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        loop_lags.append(time.perf_counter() - started - interval)
+
+        started = time.perf_counter()
+        response = await client.get(f"/users/{user_id}")
+        response.raise_for_status()
+        request_latencies.append(time.perf_counter() - started)
+
+    return request_latencies, loop_lags
+
+
+async def storm(client, concurrency: int, stop: asyncio.Event):
+    count = 0
+
+    async def worker(n: int):
+        nonlocal count
+        while not stop.is_set():
+            if n % 2:
+                response = await client.post(
+                    "/users/login", json={"name": "storm", "password": "secret"}
+                )
+            else:
+                response = await client.post(
+                    "/users/",
+                    json={
+                        "social_id": None,
+                        "provider": None,
+                        "name": f"storm-{n}-{count}",
+                        "password": "secret",
+                    },
+                )
+            response.raise_for_status()
+            count += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return count
+
+
+async def storm_phase(client, user_id: int, args):
+    stop = asyncio.Event()
+    storm_task = asyncio.create_task(storm(client, args.concurrency, stop))
+    await asyncio.sleep(0.5)
+    latencies, lags = await probe(client, user_id, args.duration, args.interval)
+    stop.set()
+    return latencies, lags, await storm_task
+
+
+@contextmanager
+def inline_hashing():
+    from users.passwords import hash_password_sync, password_hasher, verify_password_sync
+
+    async def hash(password):
+        return hash_password_sync(password)
+
+    async def verify(password, hashed):
+        return verify_password_sync(password, hashed)
+
+    with patch.object(password_hasher, "hash", hash), patch.object(
+        password_hasher, "verify", verify
+    ):
+        yield
+
+
+def summary(label: str, latencies: list[float], lags: list[float]):
+    print(
+        f"{label:<8} GET /users/{{id}} p50 {percentile(latencies, 0.5) * 1000:7.2f} "
+        f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms | "
+        f"loop lag p50 {percentile(lags, 0.5) * 1000:6.2f} "
+        f"p99 {percentile(lags, 0.99) * 1000:6.2f} ms"
+    )
+    return percentile(lags, 0.99)
+
+
+async def main(args):
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        ) as client:
+            user = (
+                await client.post(
+                    "/users/",
+                    json={
+                        "social_id": None,
+                        "provider": None,
+                        "name": "storm",
+                        "password": "secret",
+                    },
+                )
+            ).json()
+
+            idle = await probe(client, user["id"], args.duration, args.interval)
+
+            offloaded = await storm_phase(client, user["id"], args)
+            with inline_hashing():
+                inline = await storm_phase(client, user["id"], args)
+
+    summary("idle", *idle)
+    offloaded_lag = summary("offload", *offloaded[:2])
+    inline_lag = summary("inline", *inline[:2])
+    for label, (_, _, hashed) in (("offload", offloaded), ("inline", inline)):
+        print(f"{label:<8} {hashed / args.duration:.1f} signups/logins per second")
+
+    if offloaded_lag * args.min_gain > inline_lag:
+        raise SystemExit(
+            f"offloaded hashing loop lag p99 {offloaded_lag * 1000:.2f} ms is not "
+            f"{args.min_gain}x below inline hashing {inline_lag * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure GET latency and event-loop lag during a password hashing storm."
+    )
+    parser.add_argument(
+        "--database", choices=["auto", "env", "local"], default="auto"
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=5.0,
+        help="required ratio of inline to offloaded loop lag p99",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir:
+        stop = prepare_database(args.database, workdir)
+        try:
+            asyncio.run(main(args))
+        finally:
+            stop()
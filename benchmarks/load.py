@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy.engine import make_url
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: list[float], p: float):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_postgres(workdir: str):
+    try:
+        import pgserver
+    except ImportError:
+        pgserver = None
+
+    if pgserver is not None:
+        server = pgserver.get_server(workdir, cleanup_mode="stop")
+        server.psql("CREATE DATABASE workout_bench;")
+        url = make_url(server.get_uri())
+        return {"DB_HOST": url.query["host"], "DB_PORT": "5432"}, server.cleanup
+
+    if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+        raise SystemExit(
+            "No database available: set DB_* for a running PostgreSQL, "
+            "install pgserver, or put initdb/pg_ctl on PATH"
+        )
+
+    port = str(free_port())
+    data = os.path.join(workdir, "data")
+    subprocess.run(
+        ["initdb", "-D", data, "-U", "postgres", "--auth=trust"],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        [
+            "pg_ctl", "-D", data, "-w", "-l", os.path.join(workdir, "log"),
+            "-o", f"-k {workdir} -h 127.0.0.1 -p {port}", "start",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["createdb", "-h", "127.0.0.1", "-p", port, "-U", "postgres", "workout_bench"],
+        check=True,
+    )
+    stop = lambda: subprocess.run(
+        ["pg_ctl", "-D", data, "-m", "fast", "stop"], capture_output=True
+    )
+    return {"DB_HOST": "127.0.0.1", "DB_PORT": port}, stop
+
+
+def prepare_database(mode: str, workdir: str):
+    configured = all(
+        os.getenv(name) for name in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME")
+    )
+    stop = lambda: None
+
+    if mode == "local" or (mode == "auto" and not configured):
+        settings, stop = start_local_postgres(workdir)
+        os.environ.update(
+            DB_USER="postgres", DB_PASSWORD="postgres", DB_NAME="workout_bench", **settings
+        )
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+        )
+
+    os.environ.setdefault("DB_ECHO", "false")
+    os.environ.setdefault("METRICS_LOG_INTERVAL", "0")
+    return stop
+
+
+async def seed(users: int, categories: int, workouts: int):
+    from categories.services import CategoryRepository
+    from database import async_session
+    from users.services import UserRepository
+    from workouts.services import WorkoutRepository
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    async with async_session() as session:
+        user_ids = await UserRepository(session).create_many(
+            [{"name": f"bench-{i}"} for i in range(users)]
+        )
+        category_rows = [
+            {"user_id": user_id, "name": f"activity-{j}"}
+            for user_id in user_ids
+            for j in range(categories)
+        ]
+        category_ids = await CategoryRepository(session).create_many(category_rows)
+
+        workouts_repo = WorkoutRepository(session)
+        for row, category_id in zip(category_rows, category_ids):
+            await workouts_repo.create_many(
+                [
+                    {
+                        "user_id": row["user_id"],
+                        "category_id": category_id,
+                        "quantity": random.randint(1, 100),
+                        "time": now - timedelta(minutes=random.randint(0, 525_600)),
+                    }
+                    for _ in range(workouts)
+                ]
+            )
+
+    return {
+        "users": user_ids,
+        "categories": [
+            (row["user_id"], category_id)
+            for row, category_id in zip(category_rows, category_ids)
+        ],
+    }
+
+
+def scenarios(data: dict):
+    users = data["users"]
+    categories = data["categories"]
+    created_workouts = []
+
+    def user():
+        return random.choice(users)
+
+    def category():
+        return random.choice(categories)
+
+    def workout_payload():
+        user_id, category_id = category()
+        return {"user_id": user_id, "category_id": category_id, "quantity": 10}
+
+    def workout_ids(size: int):
+        return random.sample(created_workouts, min(size, len(created_workouts))) or [1]
+
+    async def post_workout(client):
+        response = await client.post("/workoutsdata/", json=workout_payload())
+        if response.is_success:
+            created_workouts.append(response.json()["id"])
+        return response
+
+    async def delete_workout(client):
+        if not created_workouts:
+            return await post_workout(client)
+        return await client.delete(f"/workoutsdata/{created_workouts.pop()}")
+
+    return {
+        "GET /users/{id}": lambda c: c.get(f"/users/{user()}"),
+        "GET /users/ (ids)": lambda c: c.get(
+            "/users/", params={"ids": [user() for _ in range(20)]}
+        ),
+        "GET /users/category/": lambda c: c.get(
+            "/users/category/", params={"category_id": category()[1]}
+        ),
+        "GET /users/{id}/stats": lambda c: c.get(
+            f"/users/{user()}/stats", params={"granularity": "week"}
+        ),
+        "GET /users/{id}/analytics": lambda c: c.get(f"/users/{user()}/analytics"),
+        "POST /users/": lambda c: c.post(
+            "/users/",
+            json={"social_id": None, "provider": None, "name": "bench", "password": None},
+        ),
+        "POST /users/ (social)": lambda c: c.post(
+            "/users/",
+            json={
+                "social_id": random.randrange(1_000),
+                "provider": "bench",
+                "name": "bench",
+                "password": None,
+            },
+        ),
+        "GET /categories/user": lambda c: c.get(
+            "/categories/user", params={"user_id": user()}
+        ),
+        "GET /categories/user (stats)": lambda c: c.get(
+            "/categories/user", params={"user_id": user(), "include_stats": True}
+        ),
+        "GET /categories/{id}": lambda c: c.get(f"/categories/{category()[1]}"),
+        "GET /categories/ (ids)": lambda c: c.get(
+            "/categories/", params={"ids": [category()[1] for _ in range(20)]}
+        ),
+        "GET /categories/{id}/leaderboard": lambda c: c.get(
+            f"/categories/{category()[1]}/leaderboard", params={"window": "month"}
+        ),
+        "POST /categories/": lambda c: c.post(
+            "/categories/", json={"user_id": user(), "name": "bench"}
+        ),
+        "GET /workoutsdata/ (page)": lambda c: c.get(
+            "/workoutsdata/", params={"user_id": user(), "limit": 50}
+        ),
+        "GET /workoutsdata/export": lambda c: c.get(
+            "/workoutsdata/export", params={"user_id": user()}
+        ),
+        "POST /workoutsdata/": post_workout,
+        "GET /workoutsdata/{id}": lambda c: c.get(
+            f"/workoutsdata/{random.choice(created_workouts or [1])}"
+        ),
+        "GET /workoutsdata/ (ids)": lambda c: c.get(
+            "/workoutsdata/", params={"ids": workout_ids(20)}
+        ),
+        "POST /workoutsdata/bulk": lambda c: c.post(
+            "/workoutsdata/bulk", json=[workout_payload() for _ in range(100)]
+        ),
+        "DELETE /workoutsdata/{id}": delete_workout,
+    }
+
+
+async def run_endpoint(client, request, requests: int, concurrency: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await request(client)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    regressions = []
+    for endpoint, current in results.items():
+        previous = baseline.get(endpoint)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{endpoint}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{endpoint}: throughput {previous['throughput_rps']} -> "
+                f"{current['throughput_rps']} rps"
+            )
+    return regressions
+
+
+async def main(args):
+    data = await seed(args.users, args.categories, args.workouts)
+    endpoints = scenarios(data)
+    selected = [
+        name for name in endpoints if not args.only or any(s in name for s in args.only)
+    ]
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+        lifespan = None
+    else:
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+        lifespan = app.router.lifespan_context(app)
+
+    results = {}
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=60
+    ) as client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            for name in selected:
+                results[name] = await run_endpoint(
+                    client, endpoints[name], args.requests, args.concurrency
+                )
+                result = results[name]
+                print(
+                    f"{name:<32} {result['throughput_rps']:>9.1f} rps "
+                    f"p50 {result['p50_ms']:>8.2f} p95 {result['p95_ms']:>8.2f} "
+                    f"p99 {result['p99_ms']:>8.2f} ms errors {result['errors']}"
+                )
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "users": args.users,
+            "categories": args.categories,
+            "workouts": args.workouts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive every router with concurrent clients and report latency."
+    )
+    parser.add_argument(
+        "--database",
+        choices=["auto", "env", "local"],
+        default="auto",
+        help="auto uses DB_* if set, otherwise starts a throwaway local PostgreSQL",
+    )
+    parser.add_argument("--base-url", help="benchmark a running server instead of main.app")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--workouts", type=int, default=200, help="per category")
+    parser.add_argument("--requests", type=int, default=500, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--only", nargs="*", help="run endpoints whose name contains any of these")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare with a previous JSON result")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative p95 increase or throughput drop",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir:
+        stop = prepare_database(args.database, workdir)
+        try:
+            asyncio.run(main(args))
+        finally:
+            stop()
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+
+from benchmarks.load import percentile, prepare_database, seed
+
+EXPLAIN = "EXPLAIN (ANALYZE, FORMAT JSON) SELECT * FROM workoutdata WHERE id = :id"
+
+
+def count_scans(plan: dict) -> int:
+    scans = int(plan["Node Type"].endswith("Scan") and "Relation Name" in plan)
+    return scans + sum(count_scans(child) for child in plan.get("Plans", ()))
+
+
+async def measure(lookups: list[tuple[int, object]], pruned: bool):
+    from database import async_session
+    from workouts.services import WorkoutRepository
+
+    latencies = []
+    async with async_session() as session:
+        workouts_repo = WorkoutRepository(session=session)
+        for id, workout_time in lookups:
+            started = time.perf_counter()
+            workout = await workouts_repo.get_by_id(
+                id, time=workout_time if pruned else None
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert workout is not None
+            session.expunge_all()
+    return {
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+async def explain(id: int, workout_time, pruned: bool):
+    from database import async_session
+
+    statement = EXPLAIN + (" AND time = :time" if pruned else "")
+    async with async_session() as session:
+        plan = (
+            await session.scalar(
+                text(statement),
+                {"id": id, "time": workout_time} if pruned else {"id": id},
+                bind_arguments={"shard_id": 0},
+            )
+        )[0]
+    return {
+        "partitions_scanned": count_scans(plan["Plan"]),
+        "planning_ms": plan["Planning Time"],
+        "execution_ms": plan["Execution Time"],
+    }
+
+
+async def main(args):
+    await seed(args.users, args.categories, args.workouts)
+
+    from database import async_session
+    from models import WorkoutData
+    from workouts.partitions import PartitionManager, add_months
+
+    async with async_session() as session:
+        lookups = (
+            await session.execute(
+                select(WorkoutData.id, WorkoutData.time)
+                .order_by(func.random())
+                .limit(args.lookups)
+            )
+        ).all()
+
+        manager = PartitionManager(session)
+        oldest = min(row.time for row in lookups).date().replace(day=1)
+        month = date.today().replace(day=1)
+        for pruned in (False, True):
+            await measure(lookups, pruned)
+
+        results = []
+        for target in sorted(args.partitions):
+            while len(await manager.list_partitions()) < target:
+                existing = await manager.list_partitions()
+                while month in existing:
+                    month = add_months(month, -1)
+                await manager.create_partition(month)
+            await session.execute(
+                text("ANALYZE workoutdata"), bind_arguments={"shard_id": 0}
+            )
+            await session.commit()
+
+            partitions = len(await manager.list_partitions())
+            sample_id, sample_time = lookups[0]
+            result = {"partitions": partitions}
+            for label, pruned in (("id", False), ("id+time", True)):
+                result[label] = {
+                    **await measure(lookups, pruned),
+                    **await explain(sample_id, sample_time, pruned),
+                }
+            results.append(result)
+            print(
+                f"{partitions:>4} partitions (data since {oldest}): "
+                + "  ".join(
+                    f"{label} mean {result[label]['mean_ms']:.3f} ms "
+                    f"p99 {result[label]['p99_ms']:.3f} ms "
+                    f"plan {result[label]['planning_ms']:.3f} ms "
+                    f"scans {result[label]['partitions_scanned']}"
+                    for label in ("id", "id+time")
+                )
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare workout lookups by id alone with lookups by (id, time) "
+        "as the number of monthly workoutdata partitions grows."
+    )
+    parser.add_argument(
+        "--database",
+        choices=["auto", "env", "local"],
+        default="auto",
+        help="auto uses DB_* if set, otherwise starts a throwaway local PostgreSQL",
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--workouts", type=int, default=50, help="per category")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument(
+        "--partitions", type=int, nargs="+", default=[12, 24, 60, 120]
+    )
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir:
+        stop = prepare_database(args.database, workdir)
+        try:
+            asyncio.run(main(args))
+        finally:
+            stop()
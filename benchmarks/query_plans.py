@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import json
+import re
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+from benchmarks.load import prepare_database, seed
+
+PLANNED = ("select", "with", "update", "delete", "insert")
+PARTITION = re.compile(r"_(y\d{4}m\d{2}|default)$")
+
+UNINDEXED_FOREIGN_KEYS = text(
+    """
+    SELECT c.conrelid::regclass::text, c.conname
+    FROM pg_constraint c
+    JOIN pg_class t ON t.oid = c.conrelid
+    WHERE c.contype = 'f'
+      AND NOT t.relispartition
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_index i
+          WHERE i.indrelid = c.conrelid
+            AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] = c.conkey
+      )
+    ORDER BY 1, 2
+    """
+)
+TABLE_ROWS = text(
+    "SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')"
+)
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = None
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is None or executemany:
+            return
+        if statement.lstrip().lower().startswith(PLANNED):
+            self.statements.append((conn.engine, statement, parameters))
+
+
+def scenarios(data: dict):
+    from analytics.services import AnalyticsRepository
+    from categories.services import CategoryRepository, delete_category_job
+    from idempotency.services import IdempotencyRepository, idempotency_keys
+    from jobs.services import Job
+    from leaderboards.services import leaderboard_registry
+    from models import utcnow
+    from stats.services import RollupRepository
+    from users.services import UserRepository, delete_user_job
+    from workouts.services import WorkoutRepository
+
+    user_id = data["users"][len(data["users"]) // 2]
+    owner_id, category_id = data["categories"][len(data["categories"]) // 2]
+    category_ids = {category for _, category in data["categories"][:20]}
+    victim_user = data["users"][-1]
+    victim_category = next(
+        category for owner, category in data["categories"] if owner != victim_user
+    )
+
+    async def workout_page(session):
+        repo = WorkoutRepository(session)
+        await repo.get_page(user_id=user_id, category_id=None, before=None, limit=50)
+        await repo.get_page(
+            user_id=None, category_id=category_id, before=None, limit=50
+        )
+        await repo.get_page(
+            user_id=user_id, category_id=None, before=(utcnow(), 0), limit=50
+        )
+
+    async def workout_get(session):
+        repo = WorkoutRepository(session)
+        page, _ = await repo.get_page(
+            user_id=user_id, category_id=None, before=None, limit=1
+        )
+        await session.commit()
+        await repo.get_by_id(page[0].id)
+
+    async def workout_history(session):
+        repo = WorkoutRepository(session)
+        await repo.get_history_version(user_id=user_id)
+        await repo.get_history_version(category_id=category_id)
+        async for _ in repo.stream_history(
+            repo.model.id, fetch_size=100, user_id=user_id
+        ):
+            break
+
+    async def workout_delete(session):
+        repo = WorkoutRepository(session)
+        page, _ = await repo.get_page(
+            user_id=user_id, category_id=None, before=None, limit=5
+        )
+        await repo.delete_many([workout.id for workout in page], auto_commit=False)
+        await session.rollback()
+
+    async def rollup_apply(session):
+        repo = WorkoutRepository(session)
+        await repo.create(
+            auto_commit=False, user_id=owner_id, category_id=category_id, quantity=1
+        )
+        await session.rollback()
+
+    return {
+        "users.get_by_id": (lambda s: UserRepository(s).get_by_id(user_id), ()),
+        "users.get_many": (
+            lambda s: UserRepository(s).get_many(data["users"][:50]),
+            (),
+        ),
+        "users.get_by_category_id": (
+            lambda s: UserRepository(s).get_by_category_id(category_id),
+            (),
+        ),
+        "users.authenticate": (
+            lambda s: UserRepository(s).authenticate("bench-0", "password"),
+            (),
+        ),
+        "users.login_or_register_by_provider_id": (
+            lambda s: UserRepository(s).login_or_register_by_provider_id(
+                id=10**9 + user_id, username="plans", provider="plans"
+            ),
+            (),
+        ),
+        "categories.get_by_id": (
+            lambda s: CategoryRepository(s).get_by_id(category_id),
+            (),
+        ),
+        "categories.get_all_by_user_id": (
+            lambda s: CategoryRepository(s).get_all_by_user_id(id=user_id),
+            (),
+        ),
+        "categories.get_all_by_user_id (stats)": (
+            lambda s: CategoryRepository(s).get_all_by_user_id(
+                id=user_id, include_stats=True
+            ),
+            (),
+        ),
+        "workouts.get_by_id": (workout_get, ()),
+        "workouts.get_page": (workout_page, ()),
+        "workouts.get_category_owners": (
+            lambda s: WorkoutRepository(s).get_category_owners(category_ids),
+            (),
+        ),
+        "workouts.history": (workout_history, ()),
+        "workouts.create": (rollup_apply, ()),
+        "workouts.delete_many": (workout_delete, ()),
+        "stats.get_buckets": (
+            lambda s: RollupRepository(s).get_buckets(
+                user_id=user_id, granularity="day", category_id=category_id
+            ),
+            (),
+        ),
+        "stats.check (user)": (
+            lambda s: RollupRepository(s).check(
+                user_id=user_id, since=utcnow().date() - timedelta(days=30)
+            ),
+            ("users",),
+        ),
+        "analytics.get_user_analytics": (
+            lambda s: AnalyticsRepository(s).get_user_analytics(
+                user_id=user_id, window=7, series_days=30
+            ),
+            (),
+        ),
+        "leaderboards.reconcile": (
+            lambda s: leaderboard_registry.reconcile(),
+            ("categories", "workout_rollups", "workoutdata"),
+        ),
+        "idempotency.get": (
+            lambda s: IdempotencyRepository(s).get(user_id, "workoutdata", "plans"),
+            (),
+        ),
+        "idempotency.purge": (lambda s: idempotency_keys.purge(), ()),
+        "jobs.delete_category": (
+            lambda s: delete_category_job(Job("delete_category"), victim_category),
+            (),
+        ),
+        "jobs.delete_user": (
+            lambda s: delete_user_job(Job("delete_user"), victim_user),
+            (),
+        ),
+    }
+
+
+def walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from walk(child)
+
+
+async def explain(engine, statement: str, parameters):
+    async with engine.connect() as connection:
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        )
+        return result.scalar()[0]["Plan"]
+
+
+async def audit_indexes():
+    from database import shard_engines
+
+    findings = []
+    rows = {}
+    for shard_id, engine in enumerate(shard_engines):
+        async with engine.connect() as connection:
+            await connection.execute(text("ANALYZE"))
+            findings.extend(
+                f"{table}: foreign key {name} has no index"
+                for table, name in (await connection.execute(UNINDEXED_FOREIGN_KEYS))
+            )
+            for table, count in await connection.execute(TABLE_ROWS):
+                rows[shard_id, table] = count
+    return sorted(set(findings)), rows
+
+
+async def check_plans(
+    data: dict, table_rows: dict, min_rows: int, max_selectivity: float
+):
+    from database import async_session, shard_engines, shard_replicas
+
+    recorder = StatementRecorder()
+    engines = {engine.sync_engine: engine for engine in shard_engines}
+    shards = {engine.sync_engine: shard_id for shard_id, engine in enumerate(shard_engines)}
+    for shard_id, replica_set in enumerate(shard_replicas):
+        for engine in replica_set.engines:
+            engines[engine.sync_engine] = engine
+            shards[engine.sync_engine] = shard_id
+    for sync_engine in engines:
+        event.listen(sync_engine, "before_cursor_execute", recorder)
+
+    results = {}
+    failures = []
+    try:
+        for name, (scenario, expected_scans) in scenarios(data).items():
+            recorder.statements = []
+            async with async_session() as session:
+                await scenario(session)
+            statements, recorder.statements = recorder.statements, None
+
+            cost = 0.0
+            scans = set()
+            selective = set()
+            for engine, statement, parameters in statements:
+                plan = await explain(engines[engine], statement, parameters)
+                cost += plan["Total Cost"]
+                for node in walk(plan):
+                    if node["Node Type"] != "Seq Scan":
+                        continue
+                    relation = PARTITION.sub("", node["Relation Name"])
+                    scans.add(relation)
+                    rows = table_rows.get((shards[engine], node["Relation Name"]), 0)
+                    if (
+                        "Filter" in node
+                        and rows >= min_rows
+                        and node["Plan Rows"] <= rows * max_selectivity
+                    ):
+                        selective.add(relation)
+
+            unexpected = sorted(selective - set(expected_scans))
+            results[name] = {
+                "statements": len(statements),
+                "total_cost": round(cost, 2),
+                "seq_scans": sorted(scans),
+            }
+            failures.extend(
+                f"{name}: selective sequential scan on {table}" for table in unexpected
+            )
+    finally:
+        for sync_engine in engines:
+            event.remove(sync_engine, "before_cursor_execute", recorder)
+    return results, failures
+
+
+async def main(args):
+    data = await seed(args.users, args.categories, args.workouts)
+
+    failures, table_rows = await audit_indexes()
+    results, plan_failures = await check_plans(
+        data, table_rows, args.min_rows, args.max_selectivity
+    )
+    failures.extend(plan_failures)
+    for name, result in results.items():
+        print(
+            f"{name:<42} {result['statements']:>3} statements "
+            f"cost {result['total_cost']:>12.2f} "
+            f"seq scans {', '.join(result['seq_scans']) or '-'}"
+        )
+
+    report = {
+        "settings": {
+            "users": args.users,
+            "categories": args.categories,
+            "workouts": args.workouts,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if current["total_cost"] > previous["total_cost"] * (1 + args.threshold):
+                failures.append(
+                    f"{name}: plan cost {previous['total_cost']} -> "
+                    f"{current['total_cost']}"
+                )
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Seed data, EXPLAIN every repository query and fail on "
+        "unindexed foreign keys, unexpected sequential scans or plan-cost regressions."
+    )
+    parser.add_argument(
+        "--database",
+        choices=["auto", "env", "local"],
+        default="auto",
+        help="auto uses DB_* if set, otherwise starts a throwaway local PostgreSQL",
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--workouts", type=int, default=40, help="per category")
+    parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=1000,
+        help="ignore sequential scans on tables smaller than this",
+    )
+    parser.add_argument(
+        "--max-selectivity",
+        type=float,
+        default=0.01,
+        help="fail on sequential scans expected to keep at most this share of rows",
+    )
+    parser.add_argument("--output", help="write plan costs as JSON")
+    parser.add_argument("--baseline", help="compare with a previous JSON result")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed relative cost increase"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir:
+        stop = prepare_database(args.database, workdir)
+        try:
+            asyncio.run(main(args))
+        finally:
+            stop()
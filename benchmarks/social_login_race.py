@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from main import app
+
+
+async def main(concurrency: int):
+    social_id = random.randrange(10**12)
+    payload = {
+        "social_id": social_id,
+        "provider": "race-benchmark",
+        "name": "race-benchmark",
+        "password": None,
+    }
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.post("/users/", json=payload) for _ in range(concurrency))
+            )
+            elapsed = time.perf_counter() - started
+
+    statuses = {response.status_code for response in responses}
+    user_ids = {response.json()["id"] for response in responses if response.is_success}
+    print(
+        f"{concurrency} first logins in {elapsed:.2f}s: "
+        f"statuses={sorted(statuses)} distinct users={sorted(user_ids)}"
+    )
+    if statuses != {200} or len(user_ids) != 1:
+        raise SystemExit("concurrent first logins did not resolve to one user")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fire simultaneous first social logins for one account."
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    asyncio.run(main(parser.parse_args().concurrency))
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    async def get(self, key: str):
+        raise NotImplementedError
+
+    async def set(self, key: str, value):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class EntityCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._loading = {}
+
+    async def get_or_load(self, key: str, loader):
+        while True:
+            value = await self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            future = self._loading.get(key)
+            if future is None:
+                break
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._loading[key] = future
+
+        try:
+            value = await loader()
+            if value is not None and self._loading.get(key) is future:
+                await self.backend.set(key, value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    async def get_many_or_load(self, keys: list[str], loader):
+        values = {}
+        waiting = {}
+        missing = []
+        for key in keys:
+            value = await self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+                values[key] = value
+            elif key in self._loading:
+                self.coalesced += 1
+                waiting[key] = self._loading[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            self.misses += len(missing)
+            loop = asyncio.get_running_loop()
+            futures = {}
+            for key in missing:
+                future = loop.create_future()
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._loading[key] = futures[key] = future
+
+            try:
+                loaded = await loader(missing)
+                for key, future in futures.items():
+                    value = loaded.get(key)
+                    if value is not None and self._loading.get(key) is future:
+                        await self.backend.set(key, value)
+            except asyncio.CancelledError:
+                for future in futures.values():
+                    future.cancel()
+                raise
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                raise
+            else:
+                for key, future in futures.items():
+                    future.set_result(loaded.get(key))
+                    values[key] = loaded.get(key)
+            finally:
+                for key, future in futures.items():
+                    if self._loading.get(key) is future:
+                        del self._loading[key]
+
+        retry = []
+        for key, future in waiting.items():
+            try:
+                values[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                retry.append(key)
+        if retry:
+            values.update(await self.get_many_or_load(retry, loader))
+        return values
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            self._loading.pop(key, None)
+            await self.backend.delete(key)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            **self.backend.stats(),
+        }
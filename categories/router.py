@@ -1,50 +1,201 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import BATCH_DELETE_MAX_IDS, BATCH_GET_MAX_IDS, LEADERBOARD_SIZE
 from database import get_async_session
+from etags import collection_etag, conditional, entity_etag
+from idempotency.services import idempotent_create
+from jobs.schemas import JobAccepted
+from jobs.services import job_registry
+from leaderboards.schemas import LeaderboardEntry, LeaderboardRead
+from leaderboards.services import (
+    activity_key,
+    leaderboard_registry,
+    window_start,
+)
+from models import utcnow
 
-from .schemas import CategoryCreate, CategoryRead
-from .services import CategoryRepository
+from .schemas import (
+    CategoryBatchDelete,
+    CategoryBatchRead,
+    CategoryCreate,
+    CategoryRead,
+    CategoryStatsRead,
+)
+from .services import CategoryRepository, delete_category_job
 
 category_router = APIRouter(prefix="/categories", tags=["categories"])
 
 
-@category_router.get("/user", response_model=list[CategoryRead])
+@category_router.get(
+    "/user", response_model=list[CategoryStatsRead] | list[CategoryRead]
+)
 async def get_all_categories_by_user_id(
-    user_id: int, session: AsyncSession = Depends(get_async_session)
+    user_id: int,
+    request: Request,
+    response: Response,
+    include_stats: bool = False,
+    session: AsyncSession = Depends(get_async_session),
 ):
     category_repo = CategoryRepository(session=session)
-    return await category_repo.get_all_by_user_id(id=user_id)
+    categories = await category_repo.get_all_by_user_id(
+        id=user_id, include_stats=include_stats
+    )
+
+    if include_stats:
+        members = [tuple(category) for category in categories]
+    else:
+        members = [(category.id, category.version) for category in categories]
+    not_modified = conditional(
+        request, response, collection_etag("categories", user_id, members)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    return categories
+
+
+@category_router.get("/", response_model=CategoryBatchRead)
+async def get_categories_by_ids(
+    request: Request,
+    response: Response,
+    ids: list[int] = Query(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if len(ids) > BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BATCH_GET_MAX_IDS} ids per request"
+        )
+
+    category_repo = CategoryRepository(session=session)
+    categories = await category_repo.get_many(ids=ids)
+
+    etag = collection_etag(
+        "categories", ids, [(category.id, category.version) for category in categories]
+    )
+    not_modified = conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    found = {category.id for category in categories}
+    return CategoryBatchRead(items=categories, missing=sorted(set(ids) - found))
 
 
 @category_router.get("/{category_id}", response_model=CategoryRead)
 async def get_categories_by_id(
-    category_id: int, session: AsyncSession = Depends(get_async_session)
+    category_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
 ):
     category_repo = CategoryRepository(session=session)
-    return await category_repo.get_by_id(id=category_id)
+    category = await category_repo.get_by_id(id=category_id)
+
+    if category is not None:
+        not_modified = conditional(request, response, entity_etag(category))
+        if not_modified is not None:
+            return not_modified
+
+    return category
+
+
+@category_router.get("/{category_id}/leaderboard", response_model=LeaderboardRead)
+async def get_category_leaderboard(
+    category_id: int,
+    window: Literal["week", "month", "all"] = "week",
+    limit: int = Query(LEADERBOARD_SIZE, ge=1, le=LEADERBOARD_SIZE),
+    session: AsyncSession = Depends(get_async_session),
+):
+    category_repo = CategoryRepository(session=session)
+    category = await category_repo.get_by_id(id=category_id)
+
+    if category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    now = utcnow()
+    top = leaderboard_registry.top(category.name, window, limit, now=now)
+    return LeaderboardRead(
+        category_id=category.id,
+        activity=activity_key(category.name),
+        window=window,
+        since=window_start(window, now),
+        entries=[
+            LeaderboardEntry(rank=rank, user_id=user_id, total=total)
+            for rank, (user_id, total) in enumerate(top, start=1)
+        ],
+    )
 
 
 @category_router.post("/", response_model=CategoryRead)
 async def create_category_handler(
-    category_data: CategoryCreate, session: AsyncSession = Depends(get_async_session)
+    category_data: CategoryCreate,
+    response: Response,
+    idempotency_key: str | None = Header(None, max_length=255),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    category_repo = CategoryRepository(session=session)
-    new_category = await category_repo.create(
-        user_id=category_data.user_id, name=category_data.name
+    async def create(auto_commit: bool = True):
+        category_repo = CategoryRepository(session=session)
+        return await category_repo.create(
+            auto_commit=auto_commit,
+            user_id=category_data.user_id,
+            name=category_data.name,
+        )
+
+    return await idempotent_create(
+        response,
+        session,
+        key=idempotency_key,
+        user_id=category_data.user_id,
+        scope="categories",
+        request=category_data,
+        response_model=CategoryRead,
+        create=create,
     )
-    return new_category
 
 
 @category_router.delete("/{category_id}")
 async def delete_category_handler(
-    category_id: int, session: AsyncSession = Depends(get_async_session)
+    category_id: int,
+    mode: Literal["cascade", "background"] = "cascade",
+    session: AsyncSession = Depends(get_async_session),
 ):
     category_repo = CategoryRepository(session=session)
 
+    if mode == "background":
+        if not await category_repo.get_by_id(id=category_id):
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        job = job_registry.submit("delete_category", delete_category_job, category_id)
+        return JSONResponse(
+            status_code=202,
+            content=JobAccepted(
+                job_id=job.id, status_url=f"/jobs/{job.id}"
+            ).model_dump(),
+        )
+
     deleted_category = await category_repo.delete_by_id(id=category_id)
 
     if not deleted_category:
-        return HTTPException(status_code=404, detail="Category not found")
+        raise HTTPException(status_code=404, detail="Category not found")
 
     return {f"Category with id {deleted_category.id}": "was deleted"}
+
+
+@category_router.delete("/", response_model=CategoryBatchDelete)
+async def delete_category_batch_handler(
+    ids: list[int] = Query(...), session: AsyncSession = Depends(get_async_session)
+):
+    if len(ids) > BATCH_DELETE_MAX_IDS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BATCH_DELETE_MAX_IDS} ids per request"
+        )
+
+    category_repo = CategoryRepository(session=session)
+    deleted = {category.id for category in await category_repo.delete_many(ids=ids)}
+
+    return CategoryBatchDelete(
+        deleted=sorted(deleted), missing=sorted(set(ids) - deleted)
+    )
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -13,3 +15,19 @@ class CategoryRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class CategoryStatsRead(CategoryRead):
+    workout_count: int
+    total_quantity: int
+    last_workout_at: datetime | None
+
+
+class CategoryBatchDelete(BaseModel):
+    deleted: list[int]
+    missing: list[int]
+
+
+class CategoryBatchRead(BaseModel):
+    items: list[CategoryRead]
+    missing: list[int]
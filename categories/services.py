@@ -1,15 +1,66 @@
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from database import BaseRepository
-from models import Category
+from config import DELETE_CHUNK_SIZE
+from database import BaseRepository, async_session
+from jobs.services import Job
+from models import Category, WorkoutData, WorkoutRollup
+from workouts.services import WorkoutRepository
 
 
 class CategoryRepository(BaseRepository[Category]):
     def __init__(self, session):
         super().__init__(Category, session)
 
-    async def get_all_by_user_id(self, id: int):
+    async def get_all_by_user_id(self, id: int, include_stats: bool = False):
+        if include_stats:
+            return await self._get_all_with_stats_by_user_id(id)
+
         query = select(self.model).where(self.model.user_id == id)
-        categories = await self.session.execute(query)
+        categories = await self._read(query)
 
         return categories.scalars().all()
+
+    async def _get_all_with_stats_by_user_id(self, id: int):
+        totals = (
+            select(
+                WorkoutRollup.category_id,
+                func.sum(WorkoutRollup.count).label("workout_count"),
+                func.sum(WorkoutRollup.total).label("total_quantity"),
+            )
+            .where(WorkoutRollup.user_id == id, WorkoutRollup.granularity == "month")
+            .group_by(WorkoutRollup.category_id)
+            .subquery()
+        )
+        last_workout_at = (
+            select(func.max(WorkoutData.time))
+            .where(WorkoutData.category_id == self.model.id)
+            .scalar_subquery()
+        )
+
+        query = (
+            select(
+                self.model.id,
+                self.model.name,
+                self.model.user_id,
+                self.model.version,
+                func.coalesce(totals.c.workout_count, 0).label("workout_count"),
+                func.coalesce(totals.c.total_quantity, 0).label("total_quantity"),
+                last_workout_at.label("last_workout_at"),
+            )
+            .outerjoin(totals, totals.c.category_id == self.model.id)
+            .where(self.model.user_id == id)
+            .order_by(self.model.id)
+        )
+        return (await self._read(query)).all()
+
+
+async def delete_category_job(job: Job, category_id: int):
+    async with async_session() as session:
+        job.progress["workouts"] = await WorkoutRepository(session).delete_in_chunks(
+            WorkoutData.category_id == category_id,
+            chunk_size=DELETE_CHUNK_SIZE,
+            on_chunk=lambda deleted: job.progress.update(workouts=deleted),
+        )
+
+        if not await CategoryRepository(session).delete_by_id(category_id):
+            raise LookupError(f"Category {category_id} not found")
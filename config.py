@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from dotenv import load_dotenv
 from os import getenv
 
@@ -12,5 +13,167 @@ DB_NAME=getenv("DB_NAME")
 if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
     raise ValueError("One or more required environment variables for the database are not set.")
 
-SYNC_DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
\ No newline at end of file
+
+
+def database_location(host: str, port: str, name: str = DB_NAME) -> str:
+    if host.startswith("/"):
+        return f"{DB_USER}:{DB_PASSWORD}@/{name}?host={host}&port={port}"
+    return f"{DB_USER}:{DB_PASSWORD}@{host}:{port}/{name}"
+
+
+def node_location(node: str) -> str:
+    address, _, name = node.strip().rpartition("/")
+    if not address or ":" in name:
+        address, name = node.strip(), DB_NAME
+    host, port = address.rsplit(":", 1)
+    return database_location(host, port, name)
+
+
+def node_list(name: str) -> list[str]:
+    return [node_location(node) for node in getenv(name, "").split(",") if node.strip()]
+
+
+DB_LOCATION = database_location(DB_HOST, DB_PORT)
+
+SYNC_DATABASE_URL = f"postgresql+psycopg2://{DB_LOCATION}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_LOCATION}"
+
+REPLICA_DATABASE_URLS = [
+    f"postgresql+asyncpg://{location}" for location in node_list("DB_REPLICAS")
+]
+
+SHARD_LOCATIONS = [DB_LOCATION, *node_list("DB_SHARDS")]
+SHARD_DATABASE_URLS = [f"postgresql+asyncpg://{location}" for location in SHARD_LOCATIONS]
+SHARD_SYNC_DATABASE_URLS = [
+    f"postgresql+psycopg2://{location}" for location in SHARD_LOCATIONS
+]
+SHARD_REPLICA_URLS = [
+    REPLICA_DATABASE_URLS,
+    *(
+        [
+            f"postgresql+asyncpg://{location}"
+            for location in node_list(f"DB_SHARD{shard_id}_REPLICAS")
+        ]
+        for shard_id in range(1, len(SHARD_LOCATIONS))
+    ),
+]
+REPLICA_STICKY_SECONDS = float(getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_HEALTH_INTERVAL = float(getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_HEALTH_TIMEOUT = float(getenv("REPLICA_HEALTH_TIMEOUT", "2"))
+
+APP_ENV = getenv("APP_ENV", "development")
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    echo: bool
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+    statement_cache_size: int
+
+
+ENGINE_PROFILES = {
+    "development": EngineSettings(
+        echo=True,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=-1,
+        pool_pre_ping=True,
+        statement_cache_size=100,
+    ),
+    "production": EngineSettings(
+        echo=False,
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=5,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_cache_size=500,
+    ),
+}
+
+if APP_ENV not in ENGINE_PROFILES:
+    raise ValueError(f"APP_ENV must be one of {', '.join(ENGINE_PROFILES)}.")
+
+
+def load_engine_settings(profile: EngineSettings) -> EngineSettings:
+    return EngineSettings(
+        echo=env_bool("DB_ECHO", profile.echo),
+        pool_size=int(getenv("DB_POOL_SIZE", profile.pool_size)),
+        max_overflow=int(getenv("DB_MAX_OVERFLOW", profile.max_overflow)),
+        pool_timeout=float(getenv("DB_POOL_TIMEOUT", profile.pool_timeout)),
+        pool_recycle=int(getenv("DB_POOL_RECYCLE", profile.pool_recycle)),
+        pool_pre_ping=env_bool("DB_POOL_PRE_PING", profile.pool_pre_ping),
+        statement_cache_size=int(
+            getenv("DB_STATEMENT_CACHE_SIZE", profile.statement_cache_size)
+        ),
+    )
+
+
+ENGINE_SETTINGS = load_engine_settings(ENGINE_PROFILES[APP_ENV])
+METRICS_LOG_INTERVAL = float(getenv("METRICS_LOG_INTERVAL", "60"))
+METRICS_LOG_LEVEL = getenv("METRICS_LOG_LEVEL", "INFO").upper()
+
+BULK_MAX_ITEMS = int(getenv("BULK_MAX_ITEMS", "5000"))
+BULK_COPY_THRESHOLD = int(getenv("BULK_COPY_THRESHOLD", "500"))
+
+WORKOUT_BATCH_ENABLED = env_bool("WORKOUT_BATCH_ENABLED", False)
+WORKOUT_BATCH_WINDOW_MS = int(getenv("WORKOUT_BATCH_WINDOW_MS", "10"))
+WORKOUT_BATCH_MAX_ROWS = int(getenv("WORKOUT_BATCH_MAX_ROWS", "200"))
+
+EXPORT_FETCH_SIZE = int(getenv("EXPORT_FETCH_SIZE", "1000"))
+EXPORT_COLUMNAR_BATCH_SIZE = int(getenv("EXPORT_COLUMNAR_BATCH_SIZE", "16384"))
+EXPORT_CACHE_DIR = getenv("EXPORT_CACHE_DIR", "export_cache")
+EXPORT_CACHE_MAX_BYTES = int(getenv("EXPORT_CACHE_MAX_BYTES", str(1024**3)))
+EXPORT_CACHE_ORPHAN_AGE = float(getenv("EXPORT_CACHE_ORPHAN_AGE", "3600"))
+
+IMPORT_MAX_BYTES = int(getenv("IMPORT_MAX_BYTES", str(2 * 1024**3)))
+IMPORT_BATCH_SIZE = int(getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(getenv("IMPORT_MAX_ERRORS", "20"))
+IMPORT_UPLOAD_DIR = getenv("IMPORT_UPLOAD_DIR") or None
+
+ENTITY_CACHE_ENABLED = env_bool("ENTITY_CACHE_ENABLED", False)
+ENTITY_CACHE_TTL = float(getenv("ENTITY_CACHE_TTL", "60"))
+ENTITY_CACHE_MAXSIZE = int(getenv("ENTITY_CACHE_MAXSIZE", "10000"))
+
+ENTITY_LOADER_ENABLED = env_bool("ENTITY_LOADER_ENABLED", True)
+ENTITY_LOADER_MAX_BATCH = int(getenv("ENTITY_LOADER_MAX_BATCH", "500"))
+
+SOCIAL_LOGIN_CACHE_TTL = float(getenv("SOCIAL_LOGIN_CACHE_TTL", "300"))
+SOCIAL_LOGIN_CACHE_MAXSIZE = int(getenv("SOCIAL_LOGIN_CACHE_MAXSIZE", "100000"))
+
+DELETE_CHUNK_SIZE = int(getenv("DELETE_CHUNK_SIZE", "5000"))
+
+IDEMPOTENCY_KEY_TTL = float(getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_CACHE_MAXSIZE = int(getenv("IDEMPOTENCY_CACHE_MAXSIZE", "10000"))
+IDEMPOTENCY_PENDING_TIMEOUT = float(getenv("IDEMPOTENCY_PENDING_TIMEOUT", "30"))
+IDEMPOTENCY_PURGE_INTERVAL = float(getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+
+BATCH_DELETE_MAX_IDS = int(getenv("BATCH_DELETE_MAX_IDS", "1000"))
+BATCH_GET_MAX_IDS = int(getenv("BATCH_GET_MAX_IDS", "500"))
+
+QUERY_REPEAT_WARN_THRESHOLD = int(getenv("QUERY_REPEAT_WARN_THRESHOLD", "10"))
+
+PASSWORD_HASH_WORKERS = int(getenv("PASSWORD_HASH_WORKERS", "4"))
+SCRYPT_N = int(getenv("SCRYPT_N", str(2**14)))
+SCRYPT_R = int(getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(getenv("SCRYPT_P", "1"))
+
+PARTITION_MONTHS_AHEAD = int(getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_RETAIN_MONTHS = int(getenv("PARTITION_RETAIN_MONTHS", "24"))
+PARTITION_ARCHIVE_DIR = getenv("PARTITION_ARCHIVE_DIR", "archive")
+
+LEADERBOARD_SIZE = int(getenv("LEADERBOARD_SIZE", "10"))
+LEADERBOARD_RECONCILE_INTERVAL = float(getenv("LEADERBOARD_RECONCILE_INTERVAL", "300"))
@@ -1,27 +1,251 @@
+import asyncio
+from itertools import count
 from typing import Generic, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import Column, delete, event, func, inspect, insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
 
-from config import ASYNC_DATABASE_URL
-from models import Base
+from cache import EntityCache, LRUCache
+from config import (
+    BULK_COPY_THRESHOLD,
+    ENGINE_SETTINGS,
+    ENTITY_CACHE_ENABLED,
+    ENTITY_CACHE_MAXSIZE,
+    ENTITY_CACHE_TTL,
+    ENTITY_LOADER_ENABLED,
+    ENTITY_LOADER_MAX_BATCH,
+    REPLICA_HEALTH_TIMEOUT,
+    REPLICA_MAX_LAG_SECONDS,
+    SHARD_DATABASE_URLS,
+    SHARD_REPLICA_URLS,
+)
+from loaders import BatchLoader
+from metrics.pool import InstrumentedAsyncPool
+from metrics.queries import instrument_engine
+from models import Base, SocialAccount, User, UserName
+from replicas import ReplicaSet, primary_pinned
+
+DIRECTORY_SHARD = 0
+DIRECTORY_MAPPERS = frozenset({SocialAccount.__mapper__, UserName.__mapper__})
+SHARD_ID_BITS = 48
+SHARD_KEYS = frozenset({"id", "user_id", "category_id"})
+
+
+class ShardingError(Exception):
+    pass
+
+
+def make_engine(url: str):
+    new_engine = create_async_engine(
+        url=url,
+        echo=ENGINE_SETTINGS.echo,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=ENGINE_SETTINGS.pool_size,
+        max_overflow=ENGINE_SETTINGS.max_overflow,
+        pool_timeout=ENGINE_SETTINGS.pool_timeout,
+        pool_recycle=ENGINE_SETTINGS.pool_recycle,
+        pool_pre_ping=ENGINE_SETTINGS.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": ENGINE_SETTINGS.statement_cache_size
+        },
+    )
+    instrument_engine(new_engine)
+    return new_engine
+
+
+shard_engines = [make_engine(url) for url in SHARD_DATABASE_URLS]
+shard_replicas = [
+    ReplicaSet(
+        [make_engine(url) for url in urls],
+        max_lag=REPLICA_MAX_LAG_SECONDS,
+        timeout=REPLICA_HEALTH_TIMEOUT,
+    )
+    for urls in SHARD_REPLICA_URLS
+]
+SHARD_IDS = range(len(shard_engines))
+_new_user_shards = count()
+
+
+def shard_of(id: int) -> int:
+    return id >> SHARD_ID_BITS
+
+
+def shard_id_range(shard_id: int) -> tuple[int, int]:
+    return max(shard_id << SHARD_ID_BITS, 1), ((shard_id + 1) << SHARD_ID_BITS) - 1
+
+
+def new_user_shard() -> int:
+    return next(_new_user_shards) % len(shard_engines)
+
+
+def _sharding_values(statement, parameters):
+    values = []
+    for element in visitors.iterate(statement):
+        if not isinstance(element, BinaryExpression):
+            continue
+        if not isinstance(element.left, Column) or element.left.key not in SHARD_KEYS:
+            continue
+        if not isinstance(element.right, BindParameter):
+            continue
+        value = parameters.get(element.right.key, element.right.effective_value)
+        if element.operator is operators.eq:
+            values.append(value)
+        elif element.operator is operators.in_op:
+            values.extend(value or ())
+    return [value for value in values if value is not None]
+
+
+def choose_shard(mapper, instance, clause=None, **kw):
+    if len(shard_engines) == 1 or mapper in DIRECTORY_MAPPERS:
+        return DIRECTORY_SHARD
+    if isinstance(instance, User):
+        return shard_of(instance.id) if instance.id else new_user_shard()
+    if getattr(instance, "user_id", None) is not None:
+        return shard_of(instance.user_id)
+    raise ShardingError(f"Cannot choose a shard for {mapper} without a user_id")
+
+
+def choose_identity_shards(mapper, primary_key, **kw):
+    return [shard_of(primary_key[0])]
+
+
+def choose_execute_shards(orm_context):
+    if len(shard_engines) == 1 or orm_context.bind_mapper in DIRECTORY_MAPPERS:
+        return [DIRECTORY_SHARD]
+
+    statement = orm_context.statement
+    if orm_context.is_insert and getattr(statement, "select", None) is None:
+        raise ShardingError("INSERT without a shard_id bind argument")
+
+    parameters = orm_context.parameters
+    values = _sharding_values(
+        statement, parameters if isinstance(parameters, dict) else {}
+    )
+    if values:
+        return sorted({shard_of(value) for value in values})
+    return SHARD_IDS
+
+
+class RoutingSession(ShardedSession):
+    def __init__(self, **kwargs):
+        super().__init__(
+            shard_chooser=choose_shard,
+            identity_chooser=choose_identity_shards,
+            execute_chooser=choose_execute_shards,
+            shards={
+                shard_id: shard_engines[shard_id].sync_engine for shard_id in SHARD_IDS
+            },
+            **kwargs,
+        )
+
+    def get_bind(
+        self,
+        mapper=None,
+        *,
+        shard_id=None,
+        instance=None,
+        clause=None,
+        replica: bool = False,
+        **kw,
+    ):
+        if shard_id is None and mapper is None and instance is None:
+            if len(shard_engines) > 1:
+                raise ShardingError("Statement needs a shard_id bind argument")
+            shard_id = DIRECTORY_SHARD
+        elif shard_id is None:
+            shard_id = self._choose_shard_and_assign(mapper, instance, clause=clause)
+
+        if replica and not self._flushing and not primary_pinned.get():
+            replica_engine = shard_replicas[shard_id].choose()
+            if replica_engine is not None:
+                return replica_engine.sync_engine
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, **kw)
 
-engine = create_async_engine(url=ASYNC_DATABASE_URL, echo=True, pool_pre_ping=True)
 
 async_session = async_sessionmaker(
-    bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 
+entity_cache = (
+    EntityCache(LRUCache(maxsize=ENTITY_CACHE_MAXSIZE, ttl=ENTITY_CACHE_TTL))
+    if ENTITY_CACHE_ENABLED
+    else None
+)
+_invalidation_tasks = set()
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_entities(session: Session):
+    keys = session.info.pop("cache_invalidations", None)
+    if keys and entity_cache is not None:
+        task = asyncio.get_running_loop().create_task(entity_cache.invalidate(*keys))
+        _invalidation_tasks.add(task)
+        task.add_done_callback(_invalidation_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_entity_invalidations(session: Session):
+    session.info.pop("cache_invalidations", None)
+
+
+def column_values(model):
+    return {
+        attribute.key: getattr(model, attribute.key)
+        for attribute in model.__mapper__.column_attrs
+    }
+
+
+async def load_entities(group, ids: list[int]):
+    model, replica = group
+    token = primary_pinned.set(not replica)
+    try:
+        async with async_session() as session:
+            query = select(model).where(model.id.in_(ids))
+            result = await session.execute(
+                query, bind_arguments={"replica": True} if replica else None
+            )
+            return {entity.id: column_values(entity) for entity in result.scalars()}
+    finally:
+        primary_pinned.reset(token)
+
+
+entity_loader = (
+    BatchLoader(load_entities, max_batch_size=ENTITY_LOADER_MAX_BATCH)
+    if ENTITY_LOADER_ENABLED
+    else None
+)
+
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
 class BaseRepository(Generic[ModelType]):
-    def __init__(self, model: type[ModelType], session: AsyncSession):
+    def __init__(
+        self,
+        model: type[ModelType],
+        session: AsyncSession,
+        cache: EntityCache | None = entity_cache,
+    ):
         self.model = model
         self.session = session
+        self.cache = cache
+
+    def _cache_key(self, id: int):
+        return f"{self.model.__tablename__}:{id}"
+
+    async def _invalidate(self, *ids: int):
+        if self.cache is None or not ids:
+            return
+
+        keys = [self._cache_key(id) for id in ids]
+        await self.cache.invalidate(*keys)
+        self.session.info.setdefault("cache_invalidations", set()).update(keys)
 
     async def create(self, auto_commit: bool = True, **kwargs):
         new_model = self.model(**kwargs)
@@ -35,32 +259,239 @@ class BaseRepository(Generic[ModelType]):
         except:
             await self.session.rollback()
             raise
+
+        await self._invalidate(new_model.id)
         return new_model
 
+    def _group_rows(self, rows: list[dict]):
+        groups = {}
+        new_users = new_user_shard() if self.model is User else None
+        for position, row in enumerate(rows):
+            if "user_id" in row:
+                shard_id = shard_of(row["user_id"])
+            elif row.get("id"):
+                shard_id = shard_of(row["id"])
+            else:
+                shard_id = new_users if new_users is not None else DIRECTORY_SHARD
+            groups.setdefault((shard_id, frozenset(row)), []).append(position)
+        return groups
+
+    async def create_many(self, rows: list[dict], auto_commit: bool = True):
+        if not rows:
+            return []
+
+        ids = [None] * len(rows)
+        try:
+            for (shard_id, _), positions in self._group_rows(rows).items():
+                group = [rows[position] for position in positions]
+                if len(group) >= BULK_COPY_THRESHOLD:
+                    group_ids = await self._copy_many(group, shard_id)
+                else:
+                    table = self.model.__table__
+                    group_ids = (
+                        await self.session.scalars(
+                            insert(table).returning(
+                                table.c.id, sort_by_parameter_order=True
+                            ),
+                            group,
+                            bind_arguments={"shard_id": shard_id},
+                        )
+                    ).all()
+                for position, id in zip(positions, group_ids):
+                    ids[position] = id
+
+            if auto_commit:
+                await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+
+        await self._invalidate(*ids)
+        return list(ids)
+
+    async def _copy_many(self, rows: list[dict], shard_id: int = DIRECTORY_SHARD):
+        table = self.model.__table__
+        sequence = func.pg_get_serial_sequence(table.name, "id")
+        ids = (
+            await self.session.scalars(
+                select(func.nextval(sequence)).select_from(
+                    func.generate_series(1, len(rows))
+                ),
+                bind_arguments={"shard_id": shard_id},
+            )
+        ).all()
+
+        columns = [column for column in table.columns if column.key != "id"]
+        records = []
+        for id, row in zip(ids, rows):
+            record = [id]
+            for column in columns:
+                if column.key in row:
+                    record.append(row[column.key])
+                elif column.default is not None and column.default.is_callable:
+                    record.append(column.default.arg(None))
+                elif column.default is not None:
+                    record.append(column.default.arg)
+                else:
+                    record.append(None)
+            records.append(tuple(record))
+
+        connection = await self.session.connection(
+            bind_arguments={"shard_id": shard_id}
+        )
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name,
+            records=records,
+            columns=["id", *(column.name for column in columns)],
+        )
+        return ids
+
+    async def _read(self, query):
+        return await self.session.execute(query, bind_arguments={"replica": True})
+
+    def _coalesced(self):
+        return entity_loader is not None and not self.session.in_transaction()
+
     async def get_by_id(self, id: int):
-        return (
-            await self.session.execute(select(self.model).where(self.model.id == id))
-        ).scalar_one_or_none()
+        if self.cache is None:
+            if not self._coalesced():
+                return await self._select_by_id(id, replica=True)
+            values = await entity_loader.load(
+                (self.model, not primary_pinned.get()), id
+            )
+        else:
+            values = await self.cache.get_or_load(
+                self._cache_key(id), lambda: self._load_values(id)
+            )
+        if values is None:
+            return None
 
-    async def delete_by_id(self, id: int, auto_commit: bool = True):
-        model = (
-            await self.session.execute(select(self.model).where(self.model.id == id))
-        ).scalar_one_or_none()
+        return await self._attach(id, values)
 
-        if not model:
+    async def _attach(self, id: int, values: dict):
+        model = self.model(**values)
+        inspect(model).identity_token = shard_of(id)
+        make_transient_to_detached(model)
+        return await self.session.merge(model, load=False)
+
+    async def _load_many_values(self, ids: list[int]):
+        if self.cache is None:
+            return await entity_loader.load_many(
+                (self.model, not primary_pinned.get()), ids
+            )
+
+        keys = {self._cache_key(id): id for id in ids}
+
+        async def load(missing: list[str]):
+            values = await entity_loader.load_many(
+                (self.model, False), [keys[key] for key in missing]
+            )
+            return {self._cache_key(id): value for id, value in values.items()}
+
+        values = await self.cache.get_many_or_load(list(keys), load)
+        return {id: values.get(key) for key, id in keys.items()}
+
+    async def get_many(self, ids: list[int]):
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+
+        if self._coalesced():
+            values = await self._load_many_values(ids)
+            models = []
+            for id in ids:
+                if values.get(id) is not None:
+                    models.append(await self._attach(id, values[id]))
+            return models
+
+        query = select(self.model).where(self.model.id.in_(ids))
+        found = {model.id: model for model in (await self._read(query)).scalars()}
+        return [found[id] for id in ids if id in found]
+
+    async def _select_by_id(self, id: int, replica: bool = False):
+        query = select(self.model).where(self.model.id == id)
+        if replica:
+            return (await self._read(query)).scalar_one_or_none()
+        return (await self.session.execute(query)).scalar_one_or_none()
+
+    async def _load_values(self, id: int):
+        if self._coalesced():
+            return await entity_loader.load((self.model, False), id)
+
+        model = await self._select_by_id(id)
+        if model is None:
             return None
 
-        await self.session.delete(model)
+        return column_values(model)
+
+    async def delete_by_id(self, id: int, auto_commit: bool = True):
+        deleted = await self.delete_many([id], auto_commit=auto_commit)
+        return deleted[0] if deleted else None
+
+    async def delete_many(self, ids: list[int], *conditions, auto_commit: bool = True):
+        query = (
+            delete(self.model)
+            .where(self.model.id.in_(ids), *conditions)
+            .returning(self.model)
+        )
         try:
+            models = (await self.session.scalars(query)).all()
             if auto_commit:
                 await self.session.commit()
-            else:
-                await self.session.flush()
         except:
             await self.session.rollback()
             raise
 
-        return model
+        await self._invalidate(*(model.id for model in models))
+        return models
+
+    async def delete_in_chunks(self, *conditions, chunk_size: int, on_chunk=None):
+        deleted = 0
+        while True:
+            ids = (
+                select(self.model.id).where(*conditions).limit(chunk_size).scalar_subquery()
+            )
+            query = (
+                delete(self.model)
+                .where(self.model.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            try:
+                result = await self.session.execute(query)
+                await self.session.commit()
+            except:
+                await self.session.rollback()
+                raise
+
+            if not result.rowcount:
+                return deleted
+
+            deleted += result.rowcount
+            if on_chunk is not None:
+                on_chunk(deleted)
+
+
+async def restrict_shard_sequences(session: AsyncSession, shard_id: int):
+    lower, upper = shard_id_range(shard_id)
+    bind_arguments = {"shard_id": shard_id}
+    for table in Base.metadata.sorted_tables:
+        sequence = await session.scalar(
+            select(func.pg_get_serial_sequence(table.name, "id")),
+            bind_arguments=bind_arguments,
+        )
+        last_value = await session.scalar(
+            text(f"SELECT last_value FROM {sequence}"), bind_arguments=bind_arguments
+        )
+        restart = f" RESTART WITH {lower}" if last_value < lower else ""
+        await session.execute(
+            text(
+                f"ALTER SEQUENCE {sequence} START WITH {lower} "
+                f"MINVALUE {lower} MAXVALUE {upper}{restart}"
+            ),
+            bind_arguments=bind_arguments,
+        )
+    await session.commit()
 
 
 async def get_async_session():
@@ -0,0 +1,32 @@
+from hashlib import sha256
+
+from fastapi import Request, Response
+
+
+def entity_etag(model) -> str:
+    return f'"{model.__tablename__}-{model.id}-{model.version}"'
+
+
+def collection_etag(*parts) -> str:
+    digest = sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return etag in candidates
+
+
+def conditional(request: Request, response: Response, etag: str):
+    if etag_matches(request, etag):
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
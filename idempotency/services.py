@@ -0,0 +1,312 @@
+import asyncio
+import logging
+from datetime import timedelta
+from hashlib import sha256
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from cache import LRUCache
+from config import (
+    DELETE_CHUNK_SIZE,
+    IDEMPOTENCY_CACHE_MAXSIZE,
+    IDEMPOTENCY_KEY_TTL,
+    IDEMPOTENCY_PENDING_TIMEOUT,
+)
+from database import BaseRepository, async_session, shard_of
+from models import IdempotencyKey, utcnow
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+class IdempotencyKeyInProgress(Exception):
+    pass
+
+
+class IdempotencyRepository(BaseRepository[IdempotencyKey]):
+    def __init__(self, session):
+        super().__init__(IdempotencyKey, session, cache=None)
+
+    async def claim(self, user_id: int, scope: str, key: str, fingerprint: str):
+        query = (
+            pg_insert(self.model)
+            .values(
+                user_id=user_id,
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                created_at=utcnow(),
+            )
+            .on_conflict_do_nothing(constraint="uq_idempotency_key")
+            .returning(self.model.id)
+        )
+        try:
+            id = await self.session.scalar(
+                query, bind_arguments={"shard_id": shard_of(user_id)}
+            )
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return id
+
+    async def take_over(self, record: IdempotencyKey):
+        query = (
+            update(self.model)
+            .where(
+                self.model.user_id == record.user_id,
+                self.model.id == record.id,
+                self.model.created_at == record.created_at,
+                self.model.response.is_(None),
+            )
+            .values(created_at=utcnow())
+            .returning(self.model.id)
+        )
+        try:
+            id = await self.session.scalar(query)
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return id
+
+    async def get(self, user_id: int, scope: str, key: str):
+        query = select(self.model).where(
+            self.model.user_id == user_id,
+            self.model.scope == scope,
+            self.model.key == key,
+        )
+        try:
+            record = (await self.session.execute(query)).scalar_one_or_none()
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return record
+
+    async def complete(self, user_id: int, id: int, response: dict):
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.user_id == user_id, self.model.id == id)
+            .values(response=response)
+        )
+
+    async def release(self, user_id: int, id: int):
+        try:
+            await self.session.execute(
+                delete(self.model).where(
+                    self.model.user_id == user_id,
+                    self.model.id == id,
+                    self.model.response.is_(None),
+                )
+            )
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+
+
+class IdempotencyKeys:
+    def __init__(self, cache: LRUCache, ttl: float, pending_timeout: float):
+        self.cache = cache
+        self.ttl = ttl
+        self.pending_timeout = pending_timeout
+        self.replays = 0
+        self.coalesced = 0
+        self._running = {}
+
+    async def run(
+        self,
+        session,
+        user_id: int,
+        scope: str,
+        key: str,
+        request: BaseModel,
+        response_model: type[BaseModel],
+        create,
+    ):
+        fingerprint = sha256(request.model_dump_json().encode()).hexdigest()
+        cache_key = f"{scope}:{user_id}:{key}"
+
+        while True:
+            stored = await self.cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint, response_model)
+
+            future = self._running.get(cache_key)
+            if future is None:
+                break
+
+            self.coalesced += 1
+            try:
+                stored = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                continue
+            return self._replay(stored, fingerprint, response_model)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._running[cache_key] = future
+        try:
+            stored, replayed = await self._execute(
+                IdempotencyRepository(session),
+                user_id,
+                scope,
+                key,
+                fingerprint,
+                response_model,
+                create,
+            )
+            await self.cache.set(cache_key, stored)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(stored)
+        finally:
+            del self._running[cache_key]
+
+        if replayed:
+            return self._replay(stored, fingerprint, response_model)
+        return response_model.model_validate(stored[1]), False
+
+    async def _execute(
+        self,
+        repository: IdempotencyRepository,
+        user_id: int,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        response_model: type[BaseModel],
+        create,
+    ):
+        deadline = asyncio.get_running_loop().time() + self.pending_timeout
+        interval = POLL_INTERVAL
+        while True:
+            id = await repository.claim(user_id, scope, key, fingerprint)
+            if id is None:
+                record = await repository.get(user_id, scope, key)
+                if record is None:
+                    continue
+                if record.response is not None:
+                    return (record.fingerprint, record.response), True
+                if record.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused()
+                if record.created_at < utcnow() - timedelta(
+                    seconds=self.pending_timeout
+                ):
+                    id = await repository.take_over(record)
+
+            if id is not None:
+                response = await self._create(
+                    repository, user_id, id, response_model, create
+                )
+                return (fingerprint, response), False
+
+            if asyncio.get_running_loop().time() > deadline:
+                raise IdempotencyKeyInProgress()
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    async def _create(
+        self,
+        repository: IdempotencyRepository,
+        user_id: int,
+        id: int,
+        response_model: type[BaseModel],
+        create,
+    ):
+        session = repository.session
+        try:
+            result = await create(auto_commit=False)
+            response = response_model.model_validate(result).model_dump(mode="json")
+            await repository.complete(user_id, id, response)
+            await session.commit()
+        except:
+            await session.rollback()
+            await repository.release(user_id, id)
+            raise
+        return response
+
+    def _replay(self, stored, fingerprint: str, response_model: type[BaseModel]):
+        stored_fingerprint, response = stored
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        self.replays += 1
+        return response_model.model_validate(response), True
+
+    async def purge(self):
+        cutoff = utcnow() - timedelta(seconds=self.ttl)
+        async with async_session() as session:
+            return await IdempotencyRepository(session).delete_in_chunks(
+                IdempotencyKey.created_at < cutoff, chunk_size=DELETE_CHUNK_SIZE
+            )
+
+    async def purge_periodically(self, interval: float):
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logger.exception("Idempotency key purge failed")
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        return {
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+            **self.cache.stats(),
+        }
+
+
+idempotency_keys = IdempotencyKeys(
+    LRUCache(maxsize=IDEMPOTENCY_CACHE_MAXSIZE, ttl=IDEMPOTENCY_KEY_TTL),
+    ttl=IDEMPOTENCY_KEY_TTL,
+    pending_timeout=IDEMPOTENCY_PENDING_TIMEOUT,
+)
+
+
+async def idempotent_create(
+    response: Response,
+    session,
+    key: str | None,
+    user_id: int,
+    scope: str,
+    request: BaseModel,
+    response_model: type[BaseModel],
+    create,
+):
+    if key is None:
+        return await create()
+
+    try:
+        result, replayed = await idempotency_keys.run(
+            session, user_id, scope, key, request, response_model, create
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request",
+        )
+    except IdempotencyKeyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+        )
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
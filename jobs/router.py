@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+
+from .schemas import JobRead
+from .services import job_registry
+
+job_router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@job_router.get("/{job_id}", response_model=JobRead)
+async def get_job(job_id: str):
+    job = job_registry.get(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: dict
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status_url: str
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+
+from models import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.progress = {}
+        self.error: str | None = None
+        self.created_at = utcnow()
+        self.finished_at: datetime | None = None
+
+
+class JobRegistry:
+    def __init__(self, max_finished: int = 1000):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._tasks = set()
+
+    def submit(self, kind: str, func, *args) -> Job:
+        job = Job(kind)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, func, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: Job, func, *args):
+        job.status = "running"
+        try:
+            await func(job, *args)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.status = "failed"
+            job.error = str(e)
+        else:
+            job.status = "succeeded"
+        finally:
+            job.finished_at = utcnow()
+            self._prune()
+
+    def _prune(self):
+        finished = [job.id for job in self._jobs.values() if job.finished_at]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+job_registry = JobRegistry()
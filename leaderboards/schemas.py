@@ -0,0 +1,18 @@
+from datetime import date
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    total: int
+
+
+class LeaderboardRead(BaseModel):
+    category_id: int
+    activity: str
+    window: Literal["week", "month", "all"]
+    since: date | None
+    entries: list[LeaderboardEntry]
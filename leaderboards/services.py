@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, cast, event, func, select
+from sqlalchemy.orm import Session
+
+from config import LEADERBOARD_SIZE
+from database import SHARD_IDS, async_session, shard_of
+from models import Category, WorkoutData, WorkoutRollup, utcnow
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ("week", "month", "all")
+
+CURRENT_SNAPSHOT = select(cast(func.pg_current_snapshot(), String))
+
+
+def activity_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def window_start(window: str, time: datetime) -> date | None:
+    day = time.date()
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    if window == "month":
+        return day.replace(day=1)
+    return None
+
+
+def window_end(window: str, start: date) -> date:
+    if window == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def record_deltas(
+    session,
+    workouts: list[tuple[int, int, int, datetime]],
+    sign: int,
+    xids: dict[int, int],
+):
+    session.info.setdefault("leaderboard_deltas", []).extend(
+        (user_id, category_id, quantity, time, sign, xids.get(shard_of(user_id)))
+        for user_id, category_id, quantity, time in workouts
+    )
+
+
+def parse_snapshot(snapshot: str) -> tuple[int, set[int]]:
+    _, xmax, in_progress = snapshot.split(":")
+    return int(xmax), {int(xid) for xid in in_progress.split(",") if xid}
+
+
+class Leaderboard:
+    def __init__(self, size: int):
+        self.size = size
+        self.totals: dict[int, int] = {}
+        self._top: list[tuple[int, int]] = []
+        self._dirty = False
+
+    def add(self, user_id: int, delta: int):
+        total = self.totals.get(user_id, 0) + delta
+        if total > 0:
+            self.totals[user_id] = total
+        else:
+            self.totals.pop(user_id, None)
+
+        if self._dirty:
+            return
+
+        ranked = [entry for entry in self._top if entry[1] != user_id]
+        was_ranked = len(ranked) < len(self._top)
+        if total > 0 and (
+            was_ranked or len(ranked) < self.size or (-total, user_id) < ranked[-1]
+        ):
+            ranked.append((-total, user_id))
+            ranked.sort()
+
+        if was_ranked and delta < 0 and len(self.totals) > len(ranked):
+            self._dirty = True
+        else:
+            self._top = ranked[: self.size]
+
+    def top(self, limit: int):
+        if self._dirty:
+            self._top = heapq.nsmallest(
+                self.size, ((-total, user_id) for user_id, total in self.totals.items())
+            )
+            self._dirty = False
+        return [(user_id, -total) for total, user_id in self._top[:limit]]
+
+    @classmethod
+    def from_totals(cls, size: int, totals: dict[int, int]):
+        board = cls(size)
+        board.totals = {user_id: total for user_id, total in totals.items() if total > 0}
+        board._dirty = True
+        return board
+
+
+class LeaderboardRegistry:
+    def __init__(self, size: int):
+        self.size = size
+        self._boards: dict[tuple[str, str, date | None], Leaderboard] = {}
+        self._categories: dict[int, str] = {}
+        self._replay: list | None = None
+        self._snapshots: dict[int, tuple[int, set[int]]] = {}
+        self._tasks = set()
+
+    def top(self, name: str, window: str, limit: int, now: datetime | None = None):
+        key = (activity_key(name), window, window_start(window, now or utcnow()))
+        board = self._boards.get(key)
+        return board.top(limit) if board is not None else []
+
+    def _visible(self, user_id: int, xid: int | None) -> bool:
+        snapshot = self._snapshots.get(shard_of(user_id))
+        if snapshot is None or xid is None:
+            return False
+        xmax, in_progress = snapshot
+        return xid < xmax and xid not in in_progress
+
+    def _apply(self, deltas: list[tuple[int, int, int, datetime, int, int]]):
+        now = utcnow()
+        for user_id, category_id, quantity, time, sign, xid in deltas:
+            if self._visible(user_id, xid):
+                continue
+            activity = self._categories.get(category_id)
+            if activity is None:
+                continue
+            for window in WINDOWS:
+                start = window_start(window, time)
+                if start != window_start(window, now):
+                    continue
+                key = (activity, window, start)
+                board = self._boards.get(key)
+                if board is None:
+                    board = self._boards[key] = Leaderboard(self.size)
+                board.add(user_id, sign * quantity)
+
+    async def apply(self, deltas: list[tuple[int, int, int, datetime, int, int]]):
+        missing = {delta[1] for delta in deltas} - self._categories.keys()
+        if missing:
+            async with async_session() as session:
+                query = select(Category.id, Category.name).where(
+                    Category.id.in_(missing)
+                )
+                for category_id, name in (await session.execute(query)).tuples():
+                    self._categories[category_id] = activity_key(name)
+
+        if self._replay is not None:
+            self._replay.extend(deltas)
+        self._apply(deltas)
+
+    def schedule(self, deltas: list):
+        task = asyncio.get_running_loop().create_task(self.apply(deltas))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def reconcile(self):
+        now = utcnow()
+        starts = {window: window_start(window, now) for window in WINDOWS}
+        self._replay = []
+        try:
+            async with async_session() as session:
+                snapshots = {}
+                for shard_id in SHARD_IDS:
+                    await session.connection(
+                        bind_arguments={"shard_id": shard_id},
+                        execution_options={"isolation_level": "REPEATABLE READ"},
+                    )
+                    snapshots[shard_id] = parse_snapshot(
+                        await session.scalar(
+                            CURRENT_SNAPSHOT, bind_arguments={"shard_id": shard_id}
+                        )
+                    )
+                categories = dict(
+                    (await session.execute(select(Category.id, Category.name)))
+                    .tuples()
+                    .all()
+                )
+                totals = {}
+                all_time = (
+                    select(
+                        WorkoutRollup.category_id,
+                        WorkoutRollup.user_id,
+                        func.sum(WorkoutRollup.total),
+                    )
+                    .where(WorkoutRollup.granularity == "month")
+                    .group_by(WorkoutRollup.category_id, WorkoutRollup.user_id)
+                )
+                totals["all"] = (await session.execute(all_time)).tuples().all()
+                for window in ("week", "month"):
+                    query = (
+                        select(
+                            WorkoutData.category_id,
+                            WorkoutData.user_id,
+                            func.sum(WorkoutData.quantity),
+                        )
+                        .where(
+                            WorkoutData.time >= starts[window],
+                            WorkoutData.time < window_end(window, starts[window]),
+                        )
+                        .group_by(WorkoutData.category_id, WorkoutData.user_id)
+                    )
+                    totals[window] = (await session.execute(query)).tuples().all()
+
+            grouped = {}
+            for window, rows in totals.items():
+                for category_id, user_id, total in rows:
+                    key = (activity_key(categories[category_id]), window, starts[window])
+                    board = grouped.setdefault(key, {})
+                    board[user_id] = board.get(user_id, 0) + total
+
+            self._categories = {
+                category_id: activity_key(name)
+                for category_id, name in categories.items()
+            }
+            self._boards = {
+                key: Leaderboard.from_totals(self.size, board)
+                for key, board in grouped.items()
+            }
+            self._snapshots = snapshots
+            self._apply(self._replay)
+        finally:
+            self._replay = None
+
+    async def reconcile_periodically(self, interval: float):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Leaderboard reconciliation failed")
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        return {
+            "boards": len(self._boards),
+            "entries": sum(len(board.totals) for board in self._boards.values()),
+        }
+
+
+leaderboard_registry = LeaderboardRegistry(LEADERBOARD_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def apply_committed_deltas(session: Session):
+    deltas = session.info.pop("leaderboard_deltas", None)
+    if deltas:
+        leaderboard_registry.schedule(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_leaderboard_deltas(session: Session):
+    session.info.pop("leaderboard_deltas", None)
@@ -0,0 +1,80 @@
+import asyncio
+
+
+class BatchLoader:
+    def __init__(self, batch_load, max_batch_size: int):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self.loads = 0
+        self.batches = 0
+        self.keys = 0
+        self.largest_batch = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._handle = None
+        self._tasks = set()
+
+    async def load(self, group, key):
+        self.loads += 1
+        pending = self._pending.setdefault(group, {})
+        future = pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            pending[key] = future
+            if len(pending) >= self.max_batch_size:
+                self._dispatch(group)
+            elif self._handle is None:
+                self._handle = loop.call_soon(self._flush)
+
+        return await asyncio.shield(future)
+
+    async def load_many(self, group, keys: list):
+        values = await asyncio.gather(*(self.load(group, key) for key in keys))
+        return dict(zip(keys, values))
+
+    def _flush(self):
+        self._handle = None
+        for group in list(self._pending):
+            self._dispatch(group)
+
+    def _dispatch(self, group):
+        batch = self._pending.pop(group, None)
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(group, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group, batch: dict):
+        self.batches += 1
+        self.keys += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        try:
+            values = await self.batch_load(group, list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(values.get(key))
+
+    def stats(self):
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "mean_batch_size": round(self.keys / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.largest_batch,
+            "coalesced": self.coalesced,
+        }
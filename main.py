@@ -1,8 +1,68 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from config import (
+    IDEMPOTENCY_PURGE_INTERVAL,
+    LEADERBOARD_RECONCILE_INTERVAL,
+    METRICS_LOG_INTERVAL,
+    METRICS_LOG_LEVEL,
+    QUERY_REPEAT_WARN_THRESHOLD,
+    REPLICA_HEALTH_INTERVAL,
+    REPLICA_STICKY_SECONDS,
+)
+from database import shard_replicas
+from idempotency.services import idempotency_keys
+from jobs.services import job_registry
+from leaderboards.services import leaderboard_registry
+from metrics.queries import QueryStatsMiddleware
+from metrics.services import configure_metrics_logger, log_metrics_periodically
+from replicas import ReadYourWritesMiddleware
 from routers import routers
+from users.passwords import password_hasher
+from workouts.batcher import workout_batcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [
+        asyncio.create_task(
+            leaderboard_registry.reconcile_periodically(LEADERBOARD_RECONCILE_INTERVAL)
+        ),
+        asyncio.create_task(
+            idempotency_keys.purge_periodically(IDEMPOTENCY_PURGE_INTERVAL)
+        ),
+    ]
+    if METRICS_LOG_INTERVAL > 0:
+        configure_metrics_logger(METRICS_LOG_LEVEL)
+        background.append(
+            asyncio.create_task(log_metrics_periodically(METRICS_LOG_INTERVAL))
+        )
+    for replica_set in shard_replicas:
+        if replica_set.engines:
+            await replica_set.check()
+            background.append(
+                asyncio.create_task(
+                    replica_set.check_periodically(REPLICA_HEALTH_INTERVAL)
+                )
+            )
+
+    yield
+
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await workout_batcher.close()
+    await job_registry.close()
+    password_hasher.close()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    QueryStatsMiddleware, repeat_threshold=QUERY_REPEAT_WARN_THRESHOLD
+)
+app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=REPLICA_STICKY_SECONDS)
 
 for router in routers:
     app.include_router(router)
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+from datetime import date
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+from config import (
+    PARTITION_ARCHIVE_DIR,
+    PARTITION_MONTHS_AHEAD,
+    PARTITION_RETAIN_MONTHS,
+    SHARD_SYNC_DATABASE_URLS,
+)
+from database import (
+    DIRECTORY_SHARD,
+    SHARD_IDS,
+    async_session,
+    restrict_shard_sequences,
+)
+from stats.services import RollupRepository
+from users.services import UserRepository
+from workouts.partitions import PartitionManager
+
+
+async def migrate(args):
+    for shard_id in SHARD_IDS:
+        alembic_config = Config("alembic.ini")
+        alembic_config.attributes["url"] = SHARD_SYNC_DATABASE_URLS[shard_id]
+        await asyncio.to_thread(command.upgrade, alembic_config, args.revision)
+        async with async_session() as session:
+            await restrict_shard_sequences(session, shard_id)
+        print(f"Shard {shard_id} migrated to {args.revision}")
+
+
+async def rebuild_rollups(args):
+    async with async_session() as session:
+        await RollupRepository(session=session).rebuild(
+            user_id=args.user_id, since=args.since
+        )
+    print("Rollups rebuilt")
+
+
+async def check_rollups(args):
+    async with async_session() as session:
+        mismatches = await RollupRepository(session=session).check(
+            user_id=args.user_id, since=args.since, limit=args.limit
+        )
+
+    for row in mismatches:
+        print(
+            f"user={row.user_id} category={row.category_id} "
+            f"{row.granularity}={row.bucket}: "
+            f"raw count={row.raw_count} total={row.raw_total}, "
+            f"rollup count={row.rollup_count} total={row.rollup_total}"
+        )
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} rollup buckets disagree with workoutdata")
+    print("Rollups are consistent")
+
+
+async def index_user_names(args):
+    async with async_session() as session:
+        indexed = await UserRepository(session=session).index_names()
+    print(f"{indexed} user names indexed")
+
+
+async def create_partitions(args):
+    created = []
+    async with async_session() as session:
+        for shard_id in SHARD_IDS:
+            names = await PartitionManager(session, shard_id).ensure_partitions(
+                months_ahead=args.months_ahead
+            )
+            created.extend((shard_id, name) for name in names)
+
+    for shard_id, name in created:
+        print(f"Created {name} on shard {shard_id}")
+    print(f"{len(created)} partitions created")
+
+
+async def archive_partitions(args):
+    archived = []
+    async with async_session() as session:
+        for shard_id in SHARD_IDS:
+            archive_dir = None
+            if not args.keep_detached:
+                archive_dir = Path(args.archive_dir)
+                if shard_id != DIRECTORY_SHARD:
+                    archive_dir /= f"shard{shard_id}"
+            archived.extend(
+                await PartitionManager(session, shard_id).archive_partitions(
+                    retain_months=args.retain_months, archive_dir=archive_dir
+                )
+            )
+
+    for name, path in archived:
+        print(f"Detached {name}" + (f", archived to {path}" if path else ""))
+    print(f"{len(archived)} partitions detached")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workout backend maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser(
+        "migrate", help="Apply Alembic migrations to every shard"
+    )
+    upgrade.add_argument("revision", nargs="?", default="head")
+    upgrade.set_defaults(handler=migrate)
+
+    rebuild = commands.add_parser(
+        "rebuild-rollups", help="Recompute workout rollups from workoutdata"
+    )
+    rebuild.add_argument("--user-id", type=int)
+    rebuild.add_argument(
+        "--since", type=date.fromisoformat, help="only buckets starting on or after"
+    )
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    check = commands.add_parser(
+        "check-rollups", help="Compare workout rollups with workoutdata"
+    )
+    check.add_argument("--user-id", type=int)
+    check.add_argument(
+        "--since", type=date.fromisoformat, help="only buckets starting on or after"
+    )
+    check.add_argument("--limit", type=int, default=100)
+    check.set_defaults(handler=check_rollups)
+
+    names = commands.add_parser(
+        "index-user-names",
+        help="Add password users from every shard to the user name directory",
+    )
+    names.set_defaults(handler=index_user_names)
+
+    create = commands.add_parser(
+        "create-partitions", help="Create upcoming monthly workoutdata partitions"
+    )
+    create.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    create.set_defaults(handler=create_partitions)
+
+    archive = commands.add_parser(
+        "archive-partitions",
+        help="Detach expired workoutdata partitions and archive them as csv.gz",
+    )
+    archive.add_argument("--retain-months", type=int, default=PARTITION_RETAIN_MONTHS)
+    archive.add_argument("--archive-dir", default=PARTITION_ARCHIVE_DIR)
+    archive.add_argument(
+        "--keep-detached",
+        action="store_true",
+        help="detach without exporting or dropping the partition tables",
+    )
+    archive.set_defaults(handler=archive_partitions)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
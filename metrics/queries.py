@@ -0,0 +1,113 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("metrics.queries")
+
+_PARAMETER_LIST = re.compile(r"\(\$\d+(?:::\w+)?(?:, \$\d+(?:::\w+)?)*\)")
+
+
+def statement_shape(statement: str):
+    return _PARAMETER_LIST.sub("(...)", " ".join(statement.split()))
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int):
+        return [(shape, count) for shape, count in self.shapes.items() if count > threshold]
+
+
+_request_stats: ContextVar[QueryStats | None] = ContextVar(
+    "request_query_stats", default=None
+)
+_trackers: set[QueryStats] = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for tracker in tuple(_trackers):
+        tracker.record(statement, elapsed)
+
+
+def instrument_engine(engine):
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    stats = QueryStats()
+    _trackers.add(stats)
+    try:
+        yield stats
+    finally:
+        _trackers.discard(stats)
+
+    if stats.count > limit:
+        shapes = "\n".join(
+            f"{count} x {shape}" for shape, count in stats.shapes.most_common()
+        )
+        raise AssertionError(
+            f"Expected at most {limit} queries, ran {stats.count}:\n{shapes}"
+        )
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app, repeat_threshold: int):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", '
+                    f"total;dur={total:.2f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            for shape, count in stats.repeated(self.repeat_threshold):
+                logger.warning(
+                    "%s %s ran the same statement %d times: %s",
+                    scope["method"],
+                    scope["path"],
+                    count,
+                    shape,
+                )
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from .services import collect_metrics
+
+metrics_router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@metrics_router.get("")
+async def get_metrics():
+    return collect_metrics()
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import logging
+import sys
+
+from database import entity_cache, entity_loader, shard_engines, shard_replicas
+from idempotency.services import idempotency_keys
+from leaderboards.services import leaderboard_registry
+from workouts.batcher import workout_batcher
+from workouts.export import export_cache
+
+logger = logging.getLogger("metrics")
+
+
+def collect_metrics():
+    return {
+        "db_shards": [
+            {"pool": engine.pool.snapshot(), "replicas": replica_set.snapshot()}
+            for engine, replica_set in zip(shard_engines, shard_replicas)
+        ],
+        "entity_cache": entity_cache.stats() if entity_cache is not None else None,
+        "entity_loader": entity_loader.stats() if entity_loader is not None else None,
+        "workout_batcher": workout_batcher.metrics.snapshot(),
+        "leaderboards": leaderboard_registry.stats(),
+        "idempotency_keys": idempotency_keys.stats(),
+        "export_cache": export_cache.stats(),
+    }
+
+
+def configure_metrics_logger(level: str):
+    logger.setLevel(level)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+
+async def log_metrics_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(json.dumps({"event": "metrics", **collect_metrics()}))
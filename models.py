@@ -1,9 +1,22 @@
-from datetime import datetime, timezone
-
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String, UniqueConstraint
+from datetime import date, datetime, timezone
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Base(DeclarativeBase):
     id: Mapped[int] = mapped_column(
         BigInteger, nullable=False, primary_key=True, autoincrement=True
@@ -14,14 +27,22 @@ class User(Base):
     __tablename__ = "users"
     name: Mapped[str] = mapped_column(String(150), nullable=False)
     password: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    timezone: Mapped[str] = mapped_column(
+        String(64), nullable=False, default="UTC", server_default="UTC"
+    )
+    version: Mapped[int] = mapped_column(
+        nullable=False, default=1, server_default="1"
+    )
 
     categories: Mapped[list["Category"]] = relationship(
-        back_populates="user", cascade="all, delete-orphan"
+        back_populates="user", cascade="all, delete-orphan", passive_deletes=True
     )
     workouts: Mapped[list["WorkoutData"]] = relationship(
-        back_populates="user", cascade="all, delete-orphan"
+        back_populates="user", cascade="all, delete-orphan", passive_deletes=True
     )
-    social_accounts: Mapped[list["SocialAccount"]] = relationship(back_populates="user")
+
+    __table_args__ = (Index("ix_users_name", "name"),)
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Category(Base):
@@ -30,12 +51,18 @@ class Category(Base):
         ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     name: Mapped[str] = mapped_column(String(150), nullable=False)
+    version: Mapped[int] = mapped_column(
+        nullable=False, default=1, server_default="1"
+    )
 
     user: Mapped["User"] = relationship(back_populates="categories")
     workouts: Mapped[list["WorkoutData"]] = relationship(
-        back_populates="category", cascade="all, delete-orphan"
+        back_populates="category", cascade="all, delete-orphan", passive_deletes=True
     )
 
+    __table_args__ = (Index("ix_categories_user_id", "user_id"),)
+    __mapper_args__ = {"version_id_col": version}
+
 
 class WorkoutData(Base):
     __tablename__ = "workoutdata"
@@ -51,20 +78,79 @@ class WorkoutData(Base):
 
     quantity: Mapped[int] = mapped_column(nullable=False)
     time: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        DateTime, default=utcnow, nullable=False
+    )
+    version: Mapped[int] = mapped_column(
+        nullable=False, default=1, server_default="1"
     )
 
+    __table_args__ = (
+        Index("ix_workoutdata_user_id_time_id", "user_id", "time", "id"),
+        Index("ix_workoutdata_category_id_time_id", "category_id", "time", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
-class SocialAccount(Base):
-    __tablename__ = "social_accounts"
 
-    user: Mapped["User"] = relationship(back_populates="social_accounts")
+class WorkoutRollup(Base):
+    __tablename__ = "workout_rollups"
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
+    category_id: Mapped[int] = mapped_column(
+        ForeignKey("categories.id", ondelete="CASCADE"), nullable=False
+    )
+    granularity: Mapped[str] = mapped_column(String(5), nullable=False)
+    bucket: Mapped[date] = mapped_column(Date, nullable=False)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "granularity",
+            "bucket",
+            "category_id",
+            name="uq_workout_rollup_bucket",
+        ),
+        Index("ix_workout_rollups_category_id", "category_id"),
+    )
+
+
+class SocialAccount(Base):
+    __tablename__ = "social_accounts"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
     provider: Mapped[str] = mapped_column(String(50), nullable=False)
     social_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
 
     __table_args__ = (
         UniqueConstraint("provider", "social_id", name="uq_provider_social_id"),
     )
+
+
+class UserName(Base):
+    __tablename__ = "user_names"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(150), nullable=False)
+
+    __table_args__ = (UniqueConstraint("name", name="uq_user_names_name"),)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    scope: Mapped[str] = mapped_column(String(50), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    response: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utcnow, nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_key"),
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
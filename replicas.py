@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from itertools import count
+
+from sqlalchemy import text
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("replicas")
+
+PIN_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+REPLICA_STATUS = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+primary_pinned: ContextVar[bool] = ContextVar("primary_pinned", default=False)
+
+
+class ReplicaSet:
+    def __init__(self, engines: list, max_lag: float, timeout: float):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.timeout = timeout
+        self.healthy = list(engines)
+        self.lag = {engine: None for engine in engines}
+        self._next = count()
+
+    def choose(self):
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def _check(self, engine):
+        async with engine.connect() as connection:
+            return float(await connection.scalar(REPLICA_STATUS))
+
+    async def check(self):
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self._check(engine), self.timeout)
+                for engine in self.engines
+            ),
+            return_exceptions=True,
+        )
+
+        healthy = []
+        for engine, result in zip(self.engines, results):
+            name = engine.url.render_as_string()
+            was_healthy = engine in self.healthy
+            if isinstance(result, BaseException):
+                self.lag[engine] = None
+                reason = f"{type(result).__name__}: {result}"
+            else:
+                self.lag[engine] = result
+                reason = f"replication lag {result:.1f}s"
+                if result <= self.max_lag:
+                    healthy.append(engine)
+                    if not was_healthy:
+                        logger.warning("Replica %s is back in rotation", name)
+                    continue
+
+            if was_healthy:
+                logger.warning("Replica %s taken out of rotation (%s)", name, reason)
+        self.healthy = healthy
+
+    async def check_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+    def snapshot(self):
+        return [
+            {
+                "url": engine.url.render_as_string(),
+                "healthy": engine in self.healthy,
+                "lag_seconds": self.lag[engine],
+                "pool": engine.pool.snapshot(),
+            }
+            for engine in self.engines
+        ]
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = scope["method"] not in SAFE_METHODS
+        token = primary_pinned.set(writes or self._pinned_by_cookie(scope))
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and writes:
+                until = time.time() + self.sticky_seconds
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{PIN_COOKIE}={until:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            primary_pinned.reset(token)
+
+    @staticmethod
+    def _pinned_by_cookie(scope):
+        for name, value in scope["headers"]:
+            if name != b"cookie":
+                continue
+            morsel = SimpleCookie(value.decode("latin-1")).get(PIN_COOKIE)
+            if morsel is None:
+                continue
+            try:
+                return float(morsel.value) > time.time()
+            except ValueError:
+                return False
+        return False
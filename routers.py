@@ -1,5 +1,7 @@
 from categories.router import category_router
+from jobs.router import job_router
+from metrics.router import metrics_router
 from users.router import user_router
 from workouts.router import workoutdata_router
 
-routers = [category_router, user_router, workoutdata_router]
+routers = [category_router, user_router, workoutdata_router, job_router, metrics_router]
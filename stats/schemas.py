@@ -0,0 +1,13 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class StatsBucket(BaseModel):
+    category_id: int
+    bucket: date
+    count: int
+    total: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,233 @@
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import (
+    Date,
+    String,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    true,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import BaseRepository, shard_of
+from models import User, WorkoutData, WorkoutRollup
+
+GRANULARITIES = ("day", "week", "month")
+UPSERT_CHUNK = 2000
+
+
+def granularity_values():
+    return values(column("granularity", String), name="granularities").data(
+        [(granularity,) for granularity in GRANULARITIES]
+    )
+
+
+def local_bucket(granularity, time):
+    local_time = func.timezone(User.timezone, func.timezone("UTC", time))
+    return cast(func.date_trunc(granularity, local_time), Date)
+
+
+class RollupRepository(BaseRepository[WorkoutRollup]):
+    def __init__(self, session):
+        super().__init__(WorkoutRollup, session)
+
+    async def apply(self, workouts: list[tuple[int, int, int, datetime]], sign: int):
+        xids = {}
+        if not workouts:
+            return xids
+
+        workouts = sorted(workouts, key=lambda workout: shard_of(workout[0]))
+        for shard_id, shard_workouts in groupby(
+            workouts, key=lambda workout: shard_of(workout[0])
+        ):
+            shard_workouts = list(shard_workouts)
+            for start in range(0, len(shard_workouts), UPSERT_CHUNK):
+                xid = await self.session.scalar(
+                    self._upsert(shard_workouts[start : start + UPSERT_CHUNK], sign),
+                    bind_arguments={"shard_id": shard_id},
+                )
+                if xid is not None:
+                    xids[shard_id] = int(xid)
+
+        if sign < 0:
+            await self.session.execute(
+                delete(self.model).where(
+                    self.model.user_id.in_({workout[0] for workout in workouts}),
+                    self.model.count <= 0,
+                )
+            )
+        return xids
+
+    def _upsert(self, workouts: list[tuple[int, int, int, datetime]], sign: int):
+        changes = values(
+            column("user_id", WorkoutData.user_id.type),
+            column("category_id", WorkoutData.category_id.type),
+            column("quantity", WorkoutData.quantity.type),
+            column("time", WorkoutData.time.type),
+            name="changes",
+        ).data(workouts)
+        granularities = granularity_values()
+        bucket = local_bucket(granularities.c.granularity, changes.c.time)
+
+        deltas = (
+            select(
+                changes.c.user_id,
+                changes.c.category_id,
+                granularities.c.granularity,
+                bucket,
+                func.count() * sign,
+                func.sum(changes.c.quantity) * sign,
+            )
+            .join(User, User.id == changes.c.user_id)
+            .join(granularities, true())
+            .group_by(
+                changes.c.user_id,
+                changes.c.category_id,
+                granularities.c.granularity,
+                bucket,
+            )
+        )
+        query = pg_insert(self.model).from_select(
+            ["user_id", "category_id", "granularity", "bucket", "count", "total"],
+            deltas,
+        )
+        return query.on_conflict_do_update(
+            constraint="uq_workout_rollup_bucket",
+            set_={
+                "count": self.model.count + query.excluded.count,
+                "total": self.model.total + query.excluded.total,
+            },
+        ).returning(cast(func.pg_current_xact_id(), String))
+
+    async def get_buckets(
+        self,
+        user_id: int,
+        granularity: str,
+        start: date | None = None,
+        end: date | None = None,
+        category_id: int | None = None,
+    ):
+        query = select(self.model).where(
+            self.model.user_id == user_id, self.model.granularity == granularity
+        )
+        if start is not None:
+            query = query.where(self.model.bucket >= start)
+        if end is not None:
+            query = query.where(self.model.bucket <= end)
+        if category_id is not None:
+            query = query.where(self.model.category_id == category_id)
+
+        query = query.order_by(self.model.bucket, self.model.category_id)
+        return (await self.session.scalars(query)).all()
+
+    def _aggregate_raw(self, user_id: int | None = None, since: date | None = None):
+        granularities = granularity_values()
+        bucket = local_bucket(granularities.c.granularity, WorkoutData.time)
+
+        query = (
+            select(
+                WorkoutData.user_id,
+                WorkoutData.category_id,
+                granularities.c.granularity,
+                bucket.label("bucket"),
+                func.count().label("count"),
+                func.sum(WorkoutData.quantity).label("total"),
+            )
+            .join(User, User.id == WorkoutData.user_id)
+            .join(granularities, true())
+            .group_by(
+                WorkoutData.user_id,
+                WorkoutData.category_id,
+                granularities.c.granularity,
+                bucket,
+            )
+        )
+        if user_id is not None:
+            query = query.where(WorkoutData.user_id == user_id)
+        if since is not None:
+            query = query.where(
+                WorkoutData.time >= since - timedelta(days=1), bucket >= since
+            )
+        return query
+
+    async def rebuild(
+        self,
+        user_id: int | None = None,
+        since: date | None = None,
+        auto_commit: bool = True,
+    ):
+        purge = delete(self.model)
+        if user_id is not None:
+            purge = purge.where(self.model.user_id == user_id)
+        if since is not None:
+            purge = purge.where(self.model.bucket >= since)
+
+        try:
+            await self.session.execute(purge)
+            await self.session.execute(
+                insert(self.model).from_select(
+                    ["user_id", "category_id", "granularity", "bucket", "count", "total"],
+                    self._aggregate_raw(user_id, since),
+                )
+            )
+            if auto_commit:
+                await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+
+    async def check(
+        self, user_id: int | None = None, since: date | None = None, limit: int = 100
+    ):
+        raw = self._aggregate_raw(user_id, since).subquery()
+        rollups = select(self.model)
+        if user_id is not None:
+            rollups = rollups.where(self.model.user_id == user_id)
+        if since is not None:
+            rollups = rollups.where(self.model.bucket >= since)
+        rollups = rollups.subquery()
+
+        query = (
+            select(
+                func.coalesce(raw.c.user_id, rollups.c.user_id).label("user_id"),
+                func.coalesce(raw.c.category_id, rollups.c.category_id).label(
+                    "category_id"
+                ),
+                func.coalesce(raw.c.granularity, rollups.c.granularity).label(
+                    "granularity"
+                ),
+                func.coalesce(raw.c.bucket, rollups.c.bucket).label("bucket"),
+                raw.c.count.label("raw_count"),
+                rollups.c.count.label("rollup_count"),
+                raw.c.total.label("raw_total"),
+                rollups.c.total.label("rollup_total"),
+            )
+            .select_from(
+                raw.join(
+                    rollups,
+                    and_(
+                        raw.c.user_id == rollups.c.user_id,
+                        raw.c.category_id == rollups.c.category_id,
+                        raw.c.granularity == rollups.c.granularity,
+                        raw.c.bucket == rollups.c.bucket,
+                    ),
+                    full=True,
+                )
+            )
+            .where(
+                or_(
+                    raw.c.count.is_distinct_from(rollups.c.count),
+                    raw.c.total.is_distinct_from(rollups.c.total),
+                )
+            )
+            .limit(limit)
+        )
+        return (await self.session.execute(query)).all()[:limit]
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DATABASE_CONFIGURED = all(
+    os.getenv(name) for name in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME")
+)
+if not DATABASE_CONFIGURED:
+    os.environ.update(
+        DB_USER="postgres",
+        DB_PASSWORD="postgres",
+        DB_HOST="127.0.0.1",
+        DB_PORT="5432",
+        DB_NAME="workout",
+    )
+os.environ.setdefault("DB_ECHO", "false")
+os.environ.setdefault("METRICS_LOG_INTERVAL", "0")
+
+
+async def dispose_engines():
+    from database import shard_engines, shard_replicas
+
+    for engine in shard_engines:
+        await engine.dispose()
+    for replica_set in shard_replicas:
+        for engine in replica_set.engines:
+            await engine.dispose()
+
+
+def run_async(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await dispose_engines()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not DATABASE_CONFIGURED:
+        pytest.skip("DB_* is not set")
+
+    from sqlalchemy import text
+
+    from database import shard_engines
+
+    async def ping():
+        for engine in shard_engines:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+    try:
+        run_async(ping())
+    except Exception as e:
+        pytest.skip(f"database is not reachable: {e}")
+
+
+@pytest.fixture(scope="session")
+def run(database):
+    return run_async
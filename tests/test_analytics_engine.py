@@ -0,0 +1,70 @@
+import numpy as np
+
+from analytics.engine import compute_metrics, epoch_week
+
+TODAY = 100
+
+
+def metrics():
+    return compute_metrics(
+        days=np.array([99, 50, 100, 100, 97]),
+        quantities=np.array([5, 9, 3, 2, 4]),
+        category_ids=np.array([1, 2, 1, 1, 1]),
+        today=TODAY,
+        window=2,
+        series_days=3,
+    )
+
+
+def test_metrics_are_grouped_by_category():
+    assert [result["category_id"] for result in metrics()] == [1, 2]
+
+
+def test_active_category_metrics():
+    active, _ = metrics()
+
+    assert active == {
+        "category_id": 1,
+        "workouts": 4,
+        "total": 14,
+        "personal_best": 5,
+        "best_day_total": 5,
+        "percentiles": {"p50": 3.5, "p90": 4.7, "p99": 4.97},
+        "current_streak": 2,
+        "longest_streak": 2,
+        "week_total": 14,
+        "previous_week_total": 0,
+        "week_over_week_delta": 14,
+        "week_over_week_pct": None,
+        "moving_average": [2.0, 2.5, 5.0],
+    }
+
+
+def test_lapsed_category_has_no_streak_or_recent_activity():
+    _, lapsed = metrics()
+
+    assert lapsed["current_streak"] == 0
+    assert lapsed["longest_streak"] == 1
+    assert lapsed["week_total"] == 0
+    assert lapsed["moving_average"] == [0.0, 0.0, 0.0]
+
+
+def test_week_over_week_percentage():
+    (result,) = compute_metrics(
+        days=np.array([TODAY, TODAY - 7, TODAY - 7]),
+        quantities=np.array([30, 10, 10]),
+        category_ids=np.array([1, 1, 1]),
+        today=TODAY,
+    )
+
+    assert result["previous_week_total"] == 20
+    assert result["week_over_week_delta"] == 10
+    assert result["week_over_week_pct"] == 50.0
+    assert len(result["moving_average"]) == 30
+
+
+def test_epoch_week_starts_on_monday():
+    monday = (np.datetime64("2024-05-13") - np.datetime64("1970-01-01")).astype(int)
+
+    assert epoch_week(monday) == epoch_week(monday + 6)
+    assert epoch_week(monday) == epoch_week(monday - 1) + 1
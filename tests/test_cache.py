@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from cache import EntityCache, LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+
+    async def scenario():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    cache = LRUCache(maxsize=10, ttl=5)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    asyncio.run(cache.set("a", 1))
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+
+    assert asyncio.run(cache.get("a")) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_get_or_load_coalesces_concurrent_misses():
+    cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"id": 1}
+
+    async def scenario():
+        values = await asyncio.gather(
+            *(cache.get_or_load("users:1", loader) for _ in range(5))
+        )
+        values.append(await cache.get_or_load("users:1", loader))
+        return values
+
+    values = asyncio.run(scenario())
+
+    assert values == [{"id": 1}] * 6
+    assert calls == [1]
+    assert (cache.hits, cache.misses, cache.coalesced) == (1, 1, 4)
+
+
+def test_missing_values_are_not_cached():
+    cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        await cache.get_or_load("users:1", loader)
+        await cache.get_or_load("users:1", loader)
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+
+
+def test_get_many_or_load_loads_only_missing_keys_in_one_call():
+    cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+    calls = []
+
+    async def loader(keys):
+        calls.append(keys)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def scenario():
+        await cache.backend.set("a", "cached")
+        return await cache.get_many_or_load(["a", "b", "c", "missing"], loader)
+
+    values = asyncio.run(scenario())
+
+    assert values == {"a": "cached", "b": "B", "c": "C", "missing": None}
+    assert calls == [["b", "c", "missing"]]
+    assert asyncio.run(cache.backend.get("b")) == "B"
+
+
+def test_get_many_or_load_waits_for_in_flight_loads():
+    cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+    calls = []
+
+    async def single():
+        calls.append(["a"])
+        await asyncio.sleep(0)
+        return "A"
+
+    async def loader(keys):
+        calls.append(keys)
+        return {key: key.upper() for key in keys}
+
+    async def scenario():
+        return await asyncio.gather(
+            cache.get_or_load("a", single),
+            cache.get_many_or_load(["a", "b"], loader),
+        )
+
+    single_value, values = asyncio.run(scenario())
+
+    assert single_value == "A"
+    assert values == {"a": "A", "b": "B"}
+    assert calls == [["a"], ["b"]]
+
+
+def test_invalidate_forces_a_reload():
+    cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+    versions = iter((1, 2))
+
+    async def loader():
+        return {"version": next(versions)}
+
+    async def scenario():
+        first = await cache.get_or_load("users:1", loader)
+        await cache.invalidate("users:1")
+        second = await cache.get_or_load("users:1", loader)
+        return first, second
+
+    assert asyncio.run(scenario()) == ({"version": 1}, {"version": 2})
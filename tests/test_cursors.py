@@ -0,0 +1,36 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime
+
+import pytest
+
+from workouts.services import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize(
+    "time, id",
+    [
+        (datetime(2024, 2, 3, 4, 5, 6), 1),
+        (datetime(2024, 2, 3, 4, 5, 6, 789012), 2**62 + 17),
+    ],
+)
+def test_cursor_round_trips(time, id):
+    cursor = encode_cursor(time, id)
+
+    assert decode_cursor(cursor) == (time, id)
+    assert "|" not in cursor and "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "%%%",
+        urlsafe_b64encode(b"no separator").decode(),
+        urlsafe_b64encode(b"yesterday|1").decode(),
+        urlsafe_b64encode(b"2024-01-01T00:00:00|one").decode(),
+        urlsafe_b64encode(b"\xff\xfe|1").decode(),
+    ],
+)
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
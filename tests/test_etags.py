@@ -0,0 +1,45 @@
+from fastapi import Request, Response
+
+from etags import collection_etag, conditional, entity_etag, etag_matches
+from models import User
+
+
+def request_with(if_none_match: str | None = None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+def test_entity_etag_includes_table_id_and_version():
+    assert entity_etag(User(id=5, name="etag", version=3)) == '"users-5-3"'
+
+
+def test_collection_etag_is_stable_and_sensitive_to_parts():
+    etag = collection_etag("users", [1, 2], [(1, 1), (2, 1)])
+
+    assert etag == collection_etag("users", [1, 2], [(1, 1), (2, 1)])
+    assert etag != collection_etag("users", [1, 2], [(1, 1), (2, 2)])
+    assert etag.startswith('"') and etag.endswith('"') and len(etag) == 34
+
+
+def test_etag_matches_lists_weak_tags_and_wildcards():
+    etag = '"abc"'
+
+    assert not etag_matches(request_with(), etag)
+    assert etag_matches(request_with('"abc"'), etag)
+    assert etag_matches(request_with('"xyz", W/"abc"'), etag)
+    assert etag_matches(request_with(" * "), etag)
+    assert not etag_matches(request_with('"xyz"'), etag)
+
+
+def test_conditional_returns_not_modified_or_sets_headers():
+    etag = '"abc"'
+
+    not_modified = conditional(request_with(etag), Response(), etag)
+    response = Response()
+    unchanged = conditional(request_with('"old"'), response, etag)
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert unchanged is None
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "no-cache"
@@ -0,0 +1,66 @@
+import os
+import random
+import time
+
+import httpx
+
+
+def test_columnar_export_cache_follows_history_version(run, tmp_path, monkeypatch):
+    from main import app
+    from workouts.export import export_cache
+
+    monkeypatch.setattr(export_cache, "directory", tmp_path)
+    orphan = tmp_path / ".orphan.tmp"
+    orphan.write_bytes(b"partial")
+    stale = time.time() - export_cache.orphan_age - 1
+    os.utime(orphan, (stale, stale))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            user = await client.post(
+                "/users/",
+                json={
+                    "social_id": None,
+                    "provider": None,
+                    "name": f"export-{random.randrange(10**12)}",
+                    "password": None,
+                },
+            )
+            user_id = user.json()["id"]
+            category = await client.post(
+                "/categories/", json={"user_id": user_id, "name": "cycling"}
+            )
+            item = {
+                "user_id": user_id,
+                "category_id": category.json()["id"],
+                "quantity": 7,
+            }
+            await client.post("/workoutsdata/bulk", json=[item, item])
+
+            params = {"user_id": user_id, "format": "columnar"}
+            first = await client.get("/workoutsdata/export", params=params)
+            hits = export_cache.hits
+            cached = await client.get("/workoutsdata/export", params=params)
+            cache_hits = export_cache.hits - hits
+            unchanged = await client.get(
+                "/workoutsdata/export",
+                params=params,
+                headers={"If-None-Match": first.headers["etag"]},
+            )
+            await client.post("/workoutsdata/", json=item)
+            changed = await client.get("/workoutsdata/export", params=params)
+
+            await client.delete(f"/users/{user_id}")
+        return first, cached, cache_hits, unchanged, changed
+
+    first, cached, cache_hits, unchanged, changed = run(scenario())
+
+    assert first.status_code == 200
+    assert cached.content == first.content
+    assert cache_hits == 1
+    assert unchanged.status_code == 304
+    assert changed.headers["etag"] != first.headers["etag"]
+    assert len(changed.content) > len(first.content)
+    assert not orphan.exists()
+    assert len(list(tmp_path.glob("*.wkc"))) == 1
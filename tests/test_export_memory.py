@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.export_memory import drop_user, measure, seed_history
+
+ROWS = 200_000
+LIMIT_MB = 64
+
+
+@pytest.fixture(scope="module")
+def history_user(run):
+    user_id = run(seed_history(ROWS))
+    yield user_id
+    run(drop_user(user_id))
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv", "columnar"])
+def test_export_peak_rss_is_bounded(run, history_user, format):
+    result = run(measure(history_user, format))
+
+    assert result["bytes"] > ROWS
+    assert result["growth"] < LIMIT_MB
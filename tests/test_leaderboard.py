@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+from leaderboards.services import (
+    Leaderboard,
+    activity_key,
+    parse_snapshot,
+    window_start,
+)
+
+
+def test_top_orders_by_total_then_user_id():
+    board = Leaderboard(size=3)
+    for user_id, delta in ((1, 10), (2, 5), (3, 10), (4, 1)):
+        board.add(user_id, delta)
+
+    assert board.top(3) == [(1, 10), (3, 10), (2, 5)]
+    assert board.top(1) == [(1, 10)]
+
+
+def test_ranked_user_falling_behind_unranked_user_is_replaced():
+    board = Leaderboard(size=2)
+    for user_id, delta in ((1, 10), (2, 5), (3, 7)):
+        board.add(user_id, delta)
+    assert board.top(2) == [(1, 10), (3, 7)]
+
+    board.add(1, -8)
+
+    assert board.top(2) == [(3, 7), (2, 5)]
+
+
+def test_non_positive_totals_leave_the_board():
+    board = Leaderboard(size=2)
+    board.add(1, 4)
+    board.add(2, 3)
+    board.add(1, -4)
+
+    assert board.totals == {2: 3}
+    assert board.top(2) == [(2, 3)]
+
+
+def test_from_totals_ignores_non_positive_totals():
+    board = Leaderboard.from_totals(2, {1: 3, 2: 0, 3: 9, 4: -1, 5: 6})
+
+    assert board.top(5) == [(3, 9), (5, 6)]
+    assert board.totals == {1: 3, 3: 9, 5: 6}
+
+
+def test_window_start_and_activity_key():
+    time = datetime(2024, 5, 16, 12, 30)
+
+    assert window_start("week", time) == date(2024, 5, 13)
+    assert window_start("month", time) == date(2024, 5, 1)
+    assert window_start("all", time) is None
+    assert activity_key("  Push   UPS ") == "push ups"
+
+
+def test_parse_snapshot():
+    assert parse_snapshot("100:120:104,110") == (120, {104, 110})
+    assert parse_snapshot("100:100:") == (100, set())
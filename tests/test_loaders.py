@@ -0,0 +1,73 @@
+import asyncio
+
+from loaders import BatchLoader
+
+
+def recording_loader(**options):
+    batches = []
+
+    async def batch_load(group, keys):
+        batches.append((group, keys))
+        return {key: f"{group}:{key}" for key in keys if key >= 0}
+
+    return BatchLoader(batch_load, **options), batches
+
+
+def test_concurrent_loads_share_one_batch_per_group():
+    loader, batches = recording_loader(max_batch_size=100)
+
+    async def scenario():
+        return await asyncio.gather(
+            loader.load("a", 1),
+            loader.load("a", 2),
+            loader.load("a", 1),
+            loader.load("b", 1),
+            loader.load("a", -1),
+        )
+
+    values = asyncio.run(scenario())
+
+    assert values == ["a:1", "a:2", "a:1", "b:1", None]
+    assert sorted(batches) == [("a", [1, 2, -1]), ("b", [1])]
+    assert loader.stats()["coalesced"] == 1
+
+
+def test_full_batches_dispatch_without_waiting():
+    loader, batches = recording_loader(max_batch_size=2)
+
+    async def scenario():
+        return await loader.load_many("a", [1, 2, 3, 4, 5])
+
+    values = asyncio.run(scenario())
+
+    assert values == {key: f"a:{key}" for key in (1, 2, 3, 4, 5)}
+    assert [keys for _, keys in batches] == [[1, 2], [3, 4], [5]]
+    assert loader.stats()["max_batch_size"] == 2
+
+
+def test_batch_errors_reach_every_waiter():
+    async def batch_load(group, keys):
+        raise RuntimeError("boom")
+
+    loader = BatchLoader(batch_load, max_batch_size=10)
+
+    async def scenario():
+        return await asyncio.gather(
+            loader.load("a", 1), loader.load("a", 2), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert [str(result) for result in results] == ["boom", "boom"]
+
+
+def test_sequential_loads_use_separate_batches():
+    loader, batches = recording_loader(max_batch_size=10)
+
+    async def scenario():
+        await loader.load("a", 1)
+        await loader.load("a", 1)
+
+    asyncio.run(scenario())
+
+    assert batches == [("a", [1]), ("a", [1])]
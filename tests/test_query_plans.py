@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.load import seed
+from benchmarks.query_plans import audit_indexes, check_plans
+
+USERS = 300
+CATEGORIES = 3
+WORKOUTS = 20
+MIN_ROWS = 1000
+MAX_SELECTIVITY = 0.01
+
+
+async def drop_users(user_ids: list[int]):
+    from database import async_session
+    from users.services import UserRepository
+
+    async with async_session() as session:
+        await UserRepository(session).delete_many(user_ids)
+
+
+@pytest.fixture(scope="module")
+def plan_data(run):
+    data = run(seed(USERS, CATEGORIES, WORKOUTS))
+    yield data
+    run(drop_users(data["users"]))
+
+
+def test_foreign_keys_are_indexed(run):
+    findings, _ = run(audit_indexes())
+
+    assert findings == []
+
+
+def test_queries_avoid_selective_sequential_scans(run, plan_data):
+    _, table_rows = run(audit_indexes())
+    results, failures = run(
+        check_plans(plan_data, table_rows, MIN_ROWS, MAX_SELECTIVITY)
+    )
+
+    assert results
+    assert failures == []
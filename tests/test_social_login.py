@@ -0,0 +1,52 @@
+import asyncio
+import random
+
+import httpx
+from sqlalchemy import func, select
+
+CONCURRENCY = 100
+
+
+def test_concurrent_first_logins_create_one_user(run):
+    from database import async_session
+    from main import app
+    from models import SocialAccount, User
+    from users.services import UserRepository
+
+    social_id = random.randrange(10**12)
+    name = f"race-{social_id}"
+    payload = {
+        "social_id": social_id,
+        "provider": "race-test",
+        "name": name,
+        "password": None,
+    }
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(client.post("/users/", json=payload) for _ in range(CONCURRENCY))
+            )
+
+        async with async_session() as session:
+            users = (
+                await session.scalars(select(User.id).where(User.name == name))
+            ).all()
+            links = await session.scalar(
+                select(func.count())
+                .select_from(SocialAccount)
+                .where(
+                    SocialAccount.provider == "race-test",
+                    SocialAccount.social_id == social_id,
+                )
+            )
+            await UserRepository(session).delete_many(users)
+        return responses, users, links
+
+    responses, users, links = run(scenario())
+
+    assert {response.status_code for response in responses} == {200}
+    assert {response.json()["id"] for response in responses} == set(users)
+    assert len(users) == 1
+    assert links == 1
@@ -0,0 +1,39 @@
+import random
+
+import httpx
+
+
+def test_password_names_are_unique_and_login_checks_one_hash(run):
+    from main import app
+
+    name = f"login-{random.randrange(10**12)}"
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            signup = {"social_id": None, "provider": None, "name": name}
+            first = await client.post("/users/", json={**signup, "password": "one"})
+            second = await client.post("/users/", json={**signup, "password": "two"})
+            passwordless = await client.post("/users/", json={**signup, "password": None})
+
+            good = await client.post("/users/login", json={"name": name, "password": "one"})
+            bad = await client.post("/users/login", json={"name": name, "password": "two"})
+            unknown = await client.post(
+                "/users/login", json={"name": f"{name}-missing", "password": "one"}
+            )
+
+            await client.delete(f"/users/{first.json()['id']}")
+            await client.delete(f"/users/{passwordless.json()['id']}")
+            again = await client.post("/users/", json={**signup, "password": "two"})
+            await client.delete(f"/users/{again.json()['id']}")
+        return first, second, passwordless, good, bad, unknown, again
+
+    first, second, passwordless, good, bad, unknown, again = run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert passwordless.status_code == 200
+    assert good.status_code == 200 and good.json()["id"] == first.json()["id"]
+    assert bad.status_code == 401
+    assert unknown.status_code == 401
+    assert again.status_code == 200
@@ -0,0 +1,73 @@
+import random
+
+import httpx
+
+
+def test_workout_time_narrows_lookups_and_deletes(run):
+    from main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            user = await client.post(
+                "/users/",
+                json={
+                    "social_id": None,
+                    "provider": None,
+                    "name": f"workouts-{random.randrange(10**12)}",
+                    "password": None,
+                },
+            )
+            user_id = user.json()["id"]
+            category = await client.post(
+                "/categories/", json={"user_id": user_id, "name": "rowing"}
+            )
+            item = {
+                "user_id": user_id,
+                "category_id": category.json()["id"],
+                "quantity": 5,
+            }
+            single = (await client.post("/workoutsdata/", json=item)).json()
+            bulk = (
+                await client.post(
+                    "/workoutsdata/bulk",
+                    json=[item, {**item, "time": "2024-02-03T04:05:06+02:00"}, item],
+                )
+            ).json()["created"]
+
+            results = {
+                "found": await client.get(
+                    f"/workoutsdata/{single['id']}", params={"time": single["time"]}
+                ),
+                "mismatched": await client.delete(
+                    "/workoutsdata/",
+                    params={
+                        "ids": [bulk[0]["id"]],
+                        "times": [bulk[0]["time"], bulk[1]["time"]],
+                    },
+                ),
+                "batch": await client.delete(
+                    "/workoutsdata/",
+                    params={
+                        "ids": [bulk[0]["id"], bulk[1]["id"], bulk[2]["id"]],
+                        "times": [bulk[0]["time"], bulk[1]["time"], bulk[1]["time"]],
+                    },
+                ),
+                "single": await client.delete(
+                    f"/workoutsdata/{single['id']}", params={"time": single["time"]}
+                ),
+            }
+            await client.delete(f"/users/{user_id}")
+        return single, bulk, results
+
+    single, bulk, results = run(scenario())
+
+    assert single["time"] is not None
+    assert bulk[1]["time"] == "2024-02-03T02:05:06"
+    assert results["found"].json()["id"] == single["id"]
+    assert results["mismatched"].status_code == 400
+    assert results["batch"].json() == {
+        "deleted": [bulk[0]["id"], bulk[1]["id"]],
+        "missing": [bulk[2]["id"]],
+    }
+    assert results["single"].status_code == 200
@@ -0,0 +1,70 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PASSWORD_HASH_WORKERS, SCRYPT_N, SCRYPT_P, SCRYPT_R
+
+SCHEME = "scrypt"
+
+
+def _b64encode(value: bytes):
+    return base64.b64encode(value).decode().rstrip("=")
+
+
+def _b64decode(value: str):
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+    )
+
+
+def hash_password_sync(password: str):
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return (
+        f"{SCHEME}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$"
+        f"{_b64encode(salt)}${_b64encode(digest)}"
+    )
+
+
+def verify_password_sync(password: str, hashed: str):
+    scheme, n, r, p, salt, digest = hashed.split("$")
+    if scheme != SCHEME:
+        raise ValueError(f"Unsupported password hash scheme {scheme!r}")
+
+    candidate = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(candidate, _b64decode(digest))
+
+
+def needs_rehash(hashed: str):
+    return hashed.split("$")[:4] != [SCHEME, str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+
+
+class PasswordHasher:
+    def __init__(self, workers: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+
+    async def hash(self, password: str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, hash_password_sync, password)
+
+    async def verify(self, password: str, hashed: str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, verify_password_sync, password, hashed
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS)
+DUMMY_HASH = hash_password_sync(os.urandom(16).hex())
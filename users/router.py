@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from analytics.schemas import UserAnalytics
+from analytics.services import AnalyticsRepository
+from config import BATCH_GET_MAX_IDS
 from database import get_async_session
+from etags import collection_etag, conditional, entity_etag
+from jobs.schemas import JobAccepted
+from jobs.services import job_registry
+from stats.schemas import StatsBucket
+from stats.services import RollupRepository
 
-from .schemas import UserCreate, UserRead
-from .services import UserRepository
+from .passwords import password_hasher
+from .schemas import UserBatchRead, UserCreate, UserLogin, UserRead
+from .services import UserNameTaken, UserRepository, delete_user_job
 
 user_router = APIRouter(prefix="/users", tags=["users"])
 
@@ -18,12 +31,83 @@ async def get_user_by_category_id(
     return await user_repo.get_by_category_id(category_id)
 
 
+@user_router.get("/", response_model=UserBatchRead)
+async def get_users_by_ids(
+    request: Request,
+    response: Response,
+    ids: list[int] = Query(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if len(ids) > BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BATCH_GET_MAX_IDS} ids per request"
+        )
+
+    user_repo = UserRepository(session=session)
+    users = await user_repo.get_many(ids=ids)
+
+    etag = collection_etag("users", ids, [(user.id, user.version) for user in users])
+    not_modified = conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    found = {user.id for user in users}
+    return UserBatchRead(items=users, missing=sorted(set(ids) - found))
+
+
 @user_router.get("/{user_id}", response_model=UserRead)
 async def get_user_by_id(
-    user_id: int, session: AsyncSession = Depends(get_async_session)
+    user_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
 ):
     user_repo = UserRepository(session=session)
-    return await user_repo.get_by_id(id=user_id)
+    user = await user_repo.get_by_id(id=user_id)
+
+    if user is not None:
+        not_modified = conditional(request, response, entity_etag(user))
+        if not_modified is not None:
+            return not_modified
+
+    return user
+
+
+@user_router.get("/{user_id}/stats", response_model=list[StatsBucket])
+async def get_user_stats(
+    user_id: int,
+    granularity: Literal["day", "week", "month"] = "day",
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    rollup_repo = RollupRepository(session=session)
+    return await rollup_repo.get_buckets(
+        user_id=user_id,
+        granularity=granularity,
+        start=start,
+        end=end,
+        category_id=category_id,
+    )
+
+
+@user_router.get("/{user_id}/analytics", response_model=UserAnalytics)
+async def get_user_analytics(
+    user_id: int,
+    window: int = Query(7, ge=1, le=365),
+    series_days: int = Query(30, ge=1, le=366),
+    session: AsyncSession = Depends(get_async_session),
+):
+    analytics_repo = AnalyticsRepository(session=session)
+    analytics = await analytics_repo.get_user_analytics(
+        user_id=user_id, window=window, series_days=series_days
+    )
+
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return analytics
 
 
 @user_router.post("/", response_model=UserRead)
@@ -34,7 +118,7 @@ async def create_user_handler(
 
     if user_data.social_id:
         if not user_data.provider:
-            return HTTPException(
+            raise HTTPException(
                 status_code=400, detail="Provider is required for social register"
             )
 
@@ -44,19 +128,58 @@ async def create_user_handler(
             provider=user_data.provider,
         )
 
-    new_user = await user_repo.create(name=user_data.name, password=user_data.password)
-    return new_user
+    if user_data.password is None:
+        return await user_repo.create(
+            name=user_data.name, password=None, timezone=user_data.timezone
+        )
+
+    password = await password_hasher.hash(user_data.password)
+    try:
+        return await user_repo.register(
+            name=user_data.name, password=password, timezone=user_data.timezone
+        )
+    except UserNameTaken:
+        raise HTTPException(status_code=409, detail="User name is already taken")
+
+
+@user_router.post("/login", response_model=UserRead)
+async def login_handler(
+    credentials: UserLogin, session: AsyncSession = Depends(get_async_session)
+):
+    user_repo = UserRepository(session=session)
+    user = await user_repo.authenticate(
+        name=credentials.name, password=credentials.password
+    )
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid name or password")
+
+    return user
 
 
 @user_router.delete("/{user_id}")
 async def delete_user_handler(
-    user_id: int, session: AsyncSession = Depends(get_async_session)
+    user_id: int,
+    mode: Literal["cascade", "background"] = "cascade",
+    session: AsyncSession = Depends(get_async_session),
 ):
     user_repo = UserRepository(session=session)
 
+    if mode == "background":
+        if not await user_repo.get_by_id(id=user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        job = job_registry.submit("delete_user", delete_user_job, user_id)
+        return JSONResponse(
+            status_code=202,
+            content=JobAccepted(
+                job_id=job.id, status_url=f"/jobs/{job.id}"
+            ).model_dump(),
+        )
+
     deleted_user = await user_repo.delete_by_id(id=user_id)
 
     if not deleted_user:
-        return HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="User not found")
 
     return {f"User with id {deleted_user.id}": "was deleted"}
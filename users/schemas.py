@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pydantic import BaseModel, field_validator
 
 
 class UserCreate(BaseModel):
@@ -6,6 +8,21 @@ class UserCreate(BaseModel):
     provider: str | None
     name: str
     password: str | None
+    timezone: str = "UTC"
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: str):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone {value!r}")
+        return value
+
+
+class UserLogin(BaseModel):
+    name: str
+    password: str
 
 
 class UserRead(BaseModel):
@@ -14,3 +31,8 @@ class UserRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserBatchRead(BaseModel):
+    items: list[UserRead]
+    missing: list[int]
@@ -1,8 +1,64 @@
-from sqlalchemy import select
-from sqlalchemy.orm.strategy_options import joinedload
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from database import BaseRepository
-from models import Category, SocialAccount, User
+from cache import LRUCache
+from categories.services import CategoryRepository
+from config import (
+    DELETE_CHUNK_SIZE,
+    SOCIAL_LOGIN_CACHE_MAXSIZE,
+    SOCIAL_LOGIN_CACHE_TTL,
+)
+from database import (
+    DIRECTORY_SHARD,
+    SHARD_IDS,
+    BaseRepository,
+    async_session,
+    new_user_shard,
+    shard_of,
+)
+from jobs.services import Job
+from models import Category, SocialAccount, User, UserName, WorkoutData
+from workouts.services import WorkoutRepository
+
+from .passwords import DUMMY_HASH, needs_rehash, password_hasher
+
+social_login_cache = LRUCache(
+    maxsize=SOCIAL_LOGIN_CACHE_MAXSIZE, ttl=SOCIAL_LOGIN_CACHE_TTL
+)
+
+LOGIN_OR_REGISTER = text(
+    """
+    WITH existing AS (
+        SELECT user_id FROM social_accounts
+        WHERE provider = :provider AND social_id = :social_id
+    ),
+    new_id AS (
+        SELECT nextval(pg_get_serial_sequence('users', 'id')) AS id
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+    ),
+    link AS (
+        INSERT INTO social_accounts (user_id, provider, social_id)
+        SELECT id, :provider, :social_id FROM new_id
+        ON CONFLICT ON CONSTRAINT uq_provider_social_id DO NOTHING
+        RETURNING user_id
+    ),
+    new_user AS (
+        INSERT INTO users (id, name)
+        SELECT user_id, :name FROM link
+        RETURNING id, name
+    )
+    SELECT id, name FROM new_user
+    UNION ALL
+    SELECT users.id, users.name FROM users JOIN existing ON users.id = existing.user_id
+    """
+)
+
+NEXT_USER_ID = select(func.nextval(func.pg_get_serial_sequence("users", "id")))
+NAME_CHUNK = 5000
+
+
+class UserNameTaken(Exception):
+    pass
 
 
 class UserRepository(BaseRepository[User]):
@@ -12,29 +68,213 @@ class UserRepository(BaseRepository[User]):
     async def login_or_register_by_provider_id(
         self, id: int, username: str, provider: str
     ):
-        query = (
-            select(SocialAccount)
-            .where(
-                (SocialAccount.provider == provider) & (SocialAccount.social_id == id)
+        key = f"{provider}:{id}"
+        user_id = await social_login_cache.get(key)
+        if user_id is not None:
+            user = await self.get_by_id(user_id)
+            if user is not None:
+                return user
+            await social_login_cache.delete(key)
+
+        params = {"provider": provider, "social_id": id, "name": username}
+        try:
+            if len(SHARD_IDS) == 1:
+                user = await self._login_or_register(params)
+            else:
+                user = await self._login_or_register_sharded(params)
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+
+        await social_login_cache.set(key, user.id)
+        return user
+
+    async def _login_or_register(self, params: dict):
+        bind_arguments = {"shard_id": DIRECTORY_SHARD}
+        user = (
+            await self.session.execute(
+                LOGIN_OR_REGISTER, params, bind_arguments=bind_arguments
             )
-            .options(joinedload(SocialAccount.user))
+        ).first()
+        if user is None:
+            user = (
+                await self.session.execute(
+                    LOGIN_OR_REGISTER, params, bind_arguments=bind_arguments
+                )
+            ).one()
+        return user
+
+    async def _login_or_register_sharded(self, params: dict):
+        link = select(SocialAccount.user_id).where(
+            SocialAccount.provider == params["provider"],
+            SocialAccount.social_id == params["social_id"],
         )
+        user_id = await self.session.scalar(link)
+        if user_id is None:
+            new_id = await self.session.scalar(
+                NEXT_USER_ID, bind_arguments={"shard_id": new_user_shard()}
+            )
+            query = (
+                pg_insert(SocialAccount)
+                .values(
+                    user_id=new_id,
+                    provider=params["provider"],
+                    social_id=params["social_id"],
+                )
+                .on_conflict_do_nothing(constraint="uq_provider_social_id")
+                .returning(SocialAccount.user_id)
+            )
+            user_id = await self.session.scalar(query)
+            if user_id is None:
+                user_id = await self.session.scalar(link)
 
-        account = (await self.session.execute(query)).scalar_one_or_none()
+        existing = select(self.model.id, self.model.name).where(
+            self.model.id == user_id
+        )
+        user = (await self.session.execute(existing)).first()
+        if user is not None:
+            return user
 
-        if account:
-            return account.user
+        query = (
+            pg_insert(self.model)
+            .values(id=user_id, name=params["name"])
+            .on_conflict_do_nothing(index_elements=["id"])
+            .returning(self.model.id, self.model.name)
+        )
+        bind_arguments = {"shard_id": shard_of(user_id)}
+        user = (await self.session.execute(query, bind_arguments=bind_arguments)).first()
+        return user or (await self.session.execute(existing)).one()
+
+    async def register(self, name: str, password: str, timezone: str):
+        try:
+            user_id = await self.session.scalar(
+                NEXT_USER_ID, bind_arguments={"shard_id": new_user_shard()}
+            )
+            reserved = await self.session.scalar(
+                pg_insert(UserName)
+                .values(name=name, user_id=user_id)
+                .on_conflict_do_nothing(constraint="uq_user_names_name")
+                .returning(UserName.user_id)
+            )
+            if reserved is None:
+                user_id = await self.session.scalar(
+                    select(UserName.user_id).where(UserName.name == name)
+                )
 
-        new_user = User(name=username)
-        self.session.add(new_user)
-        await self.session.flush()
+            query = (
+                pg_insert(self.model)
+                .values(id=user_id, name=name, password=password, timezone=timezone)
+                .on_conflict_do_nothing(index_elements=["id"])
+                .returning(self.model)
+            )
+            user = (
+                await self.session.scalars(
+                    query, bind_arguments={"shard_id": shard_of(user_id)}
+                )
+            ).first()
+            if user is None:
+                raise UserNameTaken(name)
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
 
-        new_link = SocialAccount(user_id=new_user.id, provider=provider, social_id=id)
-        self.session.add(new_link)
+        await self._invalidate(user.id)
+        return user
 
+    async def authenticate(self, name: str, password: str):
+        user_id = await self.session.scalar(
+            select(UserName.user_id).where(UserName.name == name)
+        )
+        user = None
+        if user_id is not None:
+            user = await self.session.scalar(
+                select(self.model).where(
+                    self.model.id == user_id, self.model.password.is_not(None)
+                )
+            )
         await self.session.commit()
-        return new_user
+
+        if user is None:
+            await password_hasher.verify(password, DUMMY_HASH)
+            return None
+
+        try:
+            verified = await password_hasher.verify(password, user.password)
+        except ValueError:
+            verified = False
+        if not verified:
+            return None
+
+        if needs_rehash(user.password):
+            try:
+                user.password = await password_hasher.hash(password)
+                await self._invalidate(user.id)
+                await self.session.commit()
+            except:
+                await self.session.rollback()
+                raise
+
+        return user
+
+    async def delete_many(self, ids: list[int], auto_commit: bool = True):
+        users = await super().delete_many(ids, auto_commit=False)
+        user_ids = [user.id for user in users]
+        try:
+            await self.session.execute(
+                delete(SocialAccount).where(SocialAccount.user_id.in_(user_ids))
+            )
+            await self.session.execute(
+                delete(UserName).where(UserName.user_id.in_(user_ids))
+            )
+            if auto_commit:
+                await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return users
+
+    async def index_names(self):
+        query = select(self.model.name, self.model.id).where(
+            self.model.password.is_not(None)
+        )
+        owners = {}
+        for name, id in sorted((await self.session.execute(query)).tuples()):
+            owners.setdefault(name, id)
+
+        rows = [{"name": name, "user_id": id} for name, id in owners.items()]
+        indexed = 0
+        try:
+            for start in range(0, len(rows), NAME_CHUNK):
+                query = (
+                    pg_insert(UserName)
+                    .values(rows[start : start + NAME_CHUNK])
+                    .on_conflict_do_nothing(constraint="uq_user_names_name")
+                    .returning(UserName.id)
+                )
+                indexed += len((await self.session.scalars(query)).all())
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return indexed
 
     async def get_by_category_id(self, category_id: int):
         query = select(self.model).join(Category).where(Category.id == category_id)
-        return (await self.session.execute(query)).scalar_one_or_none()
+        return (await self._read(query)).scalar_one_or_none()
+
+
+async def delete_user_job(job: Job, user_id: int):
+    async with async_session() as session:
+        job.progress["workouts"] = await WorkoutRepository(session).delete_in_chunks(
+            WorkoutData.user_id == user_id,
+            chunk_size=DELETE_CHUNK_SIZE,
+            on_chunk=lambda deleted: job.progress.update(workouts=deleted),
+        )
+        job.progress["categories"] = await CategoryRepository(
+            session
+        ).delete_in_chunks(Category.user_id == user_id, chunk_size=DELETE_CHUNK_SIZE)
+
+        if not await UserRepository(session).delete_by_id(user_id):
+            raise LookupError(f"User {user_id} not found")
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+
+from sqlalchemy.exc import IntegrityError
+
+from config import WORKOUT_BATCH_MAX_ROWS, WORKOUT_BATCH_WINDOW_MS
+from database import async_session
+
+from .services import WorkoutRepository
+
+
+class BatchMetrics:
+    def __init__(self, samples: int = 1000):
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.fallbacks = 0
+        self._waits = deque(maxlen=samples)
+
+    def record_batch(self, size: int, waits: list[float]):
+        self.batches += 1
+        self.rows += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self._waits.extend(waits)
+
+    def snapshot(self):
+        waits = sorted(self._waits)
+
+        def percentile(p: float):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 3)
+
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.max_batch_size,
+            "fallbacks": self.fallbacks,
+            "queue_wait_ms_p50": percentile(0.5),
+            "queue_wait_ms_p99": percentile(0.99),
+        }
+
+
+class WorkoutWriteBatcher:
+    def __init__(
+        self, session_factory, window: float, max_rows: int, max_inflight: int = 4
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_rows = max_rows
+        self.metrics = BatchMetrics()
+        self._pending = []
+        self._timer = None
+        self._inflight = set()
+        self._semaphore = asyncio.Semaphore(max_inflight)
+
+    async def submit(self, row: dict) -> int:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._write(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _write(self, batch: list):
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.metrics.record_batch(
+                len(batch), [started - queued for _, _, queued in batch]
+            )
+
+            try:
+                async with self.session_factory() as session:
+                    ids = await WorkoutRepository(session=session).create_many(
+                        [row for row, _, _ in batch]
+                    )
+            except IntegrityError as e:
+                if len(batch) == 1:
+                    self._resolve(batch[0][1], exception=e)
+                else:
+                    self.metrics.fallbacks += 1
+                    await self._write_each(batch)
+            except Exception as e:
+                for _, future, _ in batch:
+                    self._resolve(future, exception=e)
+            else:
+                for (_, future, _), id in zip(batch, ids):
+                    self._resolve(future, result=id)
+
+    async def _write_each(self, batch: list):
+        for row, future, _ in batch:
+            try:
+                async with self.session_factory() as session:
+                    ids = await WorkoutRepository(session=session).create_many([row])
+            except Exception as e:
+                self._resolve(future, exception=e)
+            else:
+                self._resolve(future, result=ids[0])
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result=None, exception=None):
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    async def close(self):
+        self._flush()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+
+
+workout_batcher = WorkoutWriteBatcher(
+    async_session,
+    window=WORKOUT_BATCH_WINDOW_MS / 1000,
+    max_rows=WORKOUT_BATCH_MAX_ROWS,
+)
@@ -0,0 +1,306 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from hashlib import sha256
+from pathlib import Path
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import BigInteger, cast, func
+from starlette.background import BackgroundTask
+
+from config import (
+    EXPORT_CACHE_DIR,
+    EXPORT_CACHE_MAX_BYTES,
+    EXPORT_CACHE_ORPHAN_AGE,
+    EXPORT_COLUMNAR_BATCH_SIZE,
+    EXPORT_FETCH_SIZE,
+)
+from database import async_session, shard_of
+from etags import collection_etag, etag_matches
+from models import WorkoutData
+
+from .services import WorkoutRepository
+
+EXPORT_COLUMNS = ("id", "category_id", "quantity", "time")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "columnar": "application/vnd.workout.columnar",
+}
+EXPORT_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "columnar": "wkc"}
+
+COLUMNAR_MAGIC = b"WKCOLS01"
+COLUMNAR_SCHEMA = (
+    ("id", "q", "int64"),
+    ("time", "q", "int64"),
+    ("category_id", "q", "int64"),
+    ("quantity", "i", "int32"),
+)
+COLUMNAR_SELECT = (
+    WorkoutData.id,
+    cast(func.extract("epoch", WorkoutData.time) * 1_000_000, BigInteger),
+    WorkoutData.category_id,
+    WorkoutData.quantity,
+)
+LENGTH = struct.Struct("<Q")
+COLUMNAR_END = LENGTH.pack(0)
+
+
+def encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(
+            {
+                "id": row.id,
+                "category_id": row.category_id,
+                "quantity": row.quantity,
+                "time": row.time.isoformat(),
+            }
+        )
+        + "\n"
+        for row in rows
+    ).encode()
+
+
+def encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (row.id, row.category_id, row.quantity, row.time.isoformat()) for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def columnar_header(**metadata) -> bytes:
+    schema = json.dumps(
+        {
+            "columns": [
+                {"name": name, "type": type} for name, _, type in COLUMNAR_SCHEMA
+            ],
+            "byteorder": "little",
+            "time_unit": "us",
+            **metadata,
+        }
+    ).encode()
+    schema += b" " * (-len(schema) % 8)
+    return COLUMNAR_MAGIC + LENGTH.pack(len(schema)) + schema
+
+
+def encode_columnar(rows) -> bytes:
+    chunks = [LENGTH.pack(len(rows))]
+    for (_, typecode, _), values in zip(COLUMNAR_SCHEMA, zip(*rows)):
+        column = array(typecode, values)
+        if sys.byteorder == "big":
+            column.byteswap()
+        chunks.append(column.tobytes())
+    size = sum(map(len, chunks))
+    chunks.append(b"\0" * (-size % 8))
+    return b"".join(chunks)
+
+
+def export_name(user_id: int | None, category_id: int | None) -> str:
+    parts = []
+    if user_id is not None:
+        parts.append(f"user{user_id}")
+    if category_id is not None:
+        parts.append(f"category{category_id}")
+    return "-".join(parts)
+
+
+async def export_rows(
+    format: str, user_id: int | None = None, category_id: int | None = None
+):
+    if format == "csv":
+        yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+        encode = encode_csv
+    else:
+        encode = encode_ndjson
+
+    async with async_session() as session:
+        workouts_repo = WorkoutRepository(session=session)
+        async for rows in workouts_repo.stream_history(
+            WorkoutData.id,
+            WorkoutData.category_id,
+            WorkoutData.quantity,
+            WorkoutData.time,
+            fetch_size=EXPORT_FETCH_SIZE,
+            user_id=user_id,
+            category_id=category_id,
+        ):
+            yield encode(rows)
+
+
+class ExportCache:
+    def __init__(self, directory: str, max_bytes: int, orphan_age: float):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.orphan_age = orphan_age
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name: str, version: tuple[int, ...]) -> Path:
+        digest = sha256(repr(version).encode()).hexdigest()[:32]
+        return self.directory / f"{name}.{digest}.wkc"
+
+    def lookup(self, path: Path) -> bool:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def create(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=".", suffix=".tmp", delete=False
+        )
+
+    def commit(self, file, name: str, version: tuple[int, ...]):
+        file.close()
+        path = self.path(name, version)
+        os.replace(file.name, path)
+        for stale in self.directory.glob(f"{name}.*.wkc"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        self.prune()
+
+    def discard(self, file):
+        file.close()
+        Path(file.name).unlink(missing_ok=True)
+
+    def prune(self):
+        cutoff = time.time() - self.orphan_age
+        for path in self.directory.glob(".*.tmp"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
+
+        files = []
+        for path in self.directory.glob("*.wkc"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+export_cache = ExportCache(
+    EXPORT_CACHE_DIR,
+    max_bytes=EXPORT_CACHE_MAX_BYTES,
+    orphan_age=EXPORT_CACHE_ORPHAN_AGE,
+)
+
+
+def write_columnar_batch(file, rows) -> bytes:
+    chunk = encode_columnar(rows)
+    file.write(chunk)
+    return chunk
+
+
+async def history_snapshot(user_id: int | None, category_id: int | None):
+    shard_id = shard_of(user_id if user_id is not None else category_id)
+    session = async_session()
+    try:
+        await session.connection(
+            bind_arguments={"shard_id": shard_id},
+            execution_options={"isolation_level": "REPEATABLE READ"},
+        )
+        version = await WorkoutRepository(session=session).get_history_version(
+            user_id=user_id, category_id=category_id
+        )
+    except BaseException:
+        await session.close()
+        raise
+    return session, version
+
+
+async def export_columnar(
+    user_id: int | None = None, category_id: int | None = None, snapshot=None
+):
+    name = export_name(user_id, category_id)
+    session, version = snapshot or await history_snapshot(user_id, category_id)
+    file = None
+    try:
+        async with session:
+            file = await asyncio.to_thread(export_cache.create)
+            chunk = columnar_header(
+                user_id=user_id, category_id=category_id, rows=version[0]
+            )
+            file.write(chunk)
+            yield chunk
+
+            async for rows in WorkoutRepository(session=session).stream_history(
+                *COLUMNAR_SELECT,
+                fetch_size=EXPORT_COLUMNAR_BATCH_SIZE,
+                user_id=user_id,
+                category_id=category_id,
+            ):
+                yield await asyncio.to_thread(write_columnar_batch, file, rows)
+
+        file.write(COLUMNAR_END)
+        await asyncio.to_thread(export_cache.commit, file, name, version)
+    except BaseException:
+        if file is not None:
+            await asyncio.to_thread(export_cache.discard, file)
+        raise
+    yield COLUMNAR_END
+
+
+async def columnar_response(
+    request: Request, user_id: int | None, category_id: int | None
+):
+    session, version = await history_snapshot(user_id, category_id)
+    try:
+        name = export_name(user_id, category_id)
+        etag = collection_etag("export", name, *version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            await session.close()
+            return Response(status_code=304, headers=headers)
+
+        path = export_cache.path(name, version)
+        filename = f"workouts-{name}.{EXPORT_EXTENSIONS['columnar']}"
+        if await asyncio.to_thread(export_cache.lookup, path):
+            await session.close()
+            return FileResponse(
+                path,
+                media_type=EXPORT_MEDIA_TYPES["columnar"],
+                headers=headers,
+                filename=filename,
+            )
+    except BaseException:
+        await session.close()
+        raise
+
+    return StreamingResponse(
+        export_columnar(
+            user_id=user_id, category_id=category_id, snapshot=(session, version)
+        ),
+        media_type=EXPORT_MEDIA_TYPES["columnar"],
+        headers={
+            **headers,
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+        background=BackgroundTask(session.close),
+    )
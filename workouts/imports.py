@@ -0,0 +1,303 @@
+import asyncio
+import csv
+import io
+import re
+import zipfile
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from xml.etree.ElementTree import iterparse
+
+from python_multipart import FormParser
+from python_multipart.multipart import parse_options_header
+from sqlalchemy import select
+
+from categories.services import CategoryRepository
+from config import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX_BYTES,
+    IMPORT_MAX_ERRORS,
+    IMPORT_UPLOAD_DIR,
+)
+from database import async_session
+from jobs.services import Job
+from leaderboards.services import activity_key
+from models import Category
+
+from .schemas import MAX_QUANTITY
+from .services import WorkoutRepository
+
+IMPORT_FORMATS = {".csv": "csv", ".gpx": "gpx", ".xml": "health", ".zip": "health"}
+CSV_COLUMNS = {
+    "activity": ("activity", "category", "type", "exercise", "name"),
+    "quantity": ("quantity", "count", "reps", "value", "amount", "duration"),
+    "time": ("time", "date", "datetime", "timestamp", "start", "start_time"),
+}
+HEALTH_ACTIVITY_PREFIX = "HKWorkoutActivityType"
+HEALTH_TIME_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+HEALTH_MINUTES = {"min": 1, "s": 1 / 60, "h": 60}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def receive_upload(request, field: str = "file"):
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload")
+
+    files = []
+    parser = FormParser(
+        "multipart/form-data",
+        on_field=None,
+        on_file=files.append,
+        boundary=params[b"boundary"],
+        config={"UPLOAD_DIR": IMPORT_UPLOAD_DIR},
+    )
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > IMPORT_MAX_BYTES:
+                raise UploadTooLarge(f"Uploads are limited to {IMPORT_MAX_BYTES} bytes")
+            await asyncio.to_thread(parser.write, chunk)
+        parser.finalize()
+    except:
+        for file in files:
+            file.close()
+        raise
+
+    upload = None
+    for file in files:
+        if upload is None and file.field_name == field.encode():
+            upload = file
+        else:
+            file.close()
+    if upload is None:
+        raise ValueError(f"Missing '{field}' file field")
+
+    upload.file_object.seek(0)
+    return upload
+
+
+def detect_format(file_name: bytes | None) -> str | None:
+    if not file_name:
+        return None
+    suffix = file_name.decode(errors="replace").lower().rpartition(".")[2]
+    return IMPORT_FORMATS.get(f".{suffix}")
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        header = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        columns = {}
+        for key, aliases in CSV_COLUMNS.items():
+            column = next((header[alias] for alias in aliases if alias in header), None)
+            if column is None:
+                raise ValueError(
+                    f"CSV has no {key} column (one of {', '.join(aliases)})"
+                )
+            columns[key] = column
+
+        for record, row in enumerate(reader, 1):
+            yield (
+                record,
+                row[columns["activity"]],
+                row[columns["quantity"]],
+                row[columns["time"]],
+            )
+    finally:
+        text.detach()
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def read_gpx(file):
+    parents = []
+    record = 0
+    track = None
+    for event, element in iterparse(file, events=("start", "end")):
+        tag = _local_name(element.tag)
+        if event == "start":
+            if tag == "trk":
+                track = {"activity": None, "name": None, "first": None, "last": None}
+            parents.append(element)
+            continue
+
+        parents.pop()
+        if track is not None:
+            parent = _local_name(parents[-1].tag) if parents else None
+            if tag in ("type", "name") and parent == "trk":
+                track["activity" if tag == "type" else "name"] = element.text
+            elif tag == "time" and parent == "trkpt":
+                track["first"] = track["first"] or element.text
+                track["last"] = element.text
+            elif tag == "trk":
+                record += 1
+                minutes = None
+                if track["first"] is not None:
+                    first = datetime.fromisoformat(track["first"])
+                    last = datetime.fromisoformat(track["last"])
+                    minutes = (last - first).total_seconds() / 60
+                yield record, track["activity"] or track["name"], minutes, track["first"]
+                track = None
+        if parents:
+            parents[-1].remove(element)
+
+
+def _health_activity(name: str | None) -> str | None:
+    if name is None:
+        return None
+    name = name.removeprefix(HEALTH_ACTIVITY_PREFIX)
+    return re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name)
+
+
+def read_health(file):
+    with ExitStack() as stack:
+        if zipfile.is_zipfile(file):
+            archive = stack.enter_context(zipfile.ZipFile(file))
+            member = next(
+                (name for name in archive.namelist() if name.endswith("export.xml")),
+                None,
+            )
+            if member is None:
+                raise ValueError("Archive has no export.xml")
+            source = stack.enter_context(archive.open(member))
+        else:
+            file.seek(0)
+            source = file
+
+        parents = []
+        record = 0
+        for event, element in iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if element.tag == "Workout":
+                record += 1
+                duration = element.get("duration")
+                if duration is not None:
+                    unit = HEALTH_MINUTES.get(element.get("durationUnit", "min"), 1)
+                    duration = float(duration) * unit
+                yield (
+                    record,
+                    _health_activity(element.get("workoutActivityType")),
+                    duration,
+                    element.get("startDate"),
+                )
+            if parents:
+                parents[-1].remove(element)
+
+
+IMPORT_READERS = {"csv": read_csv, "gpx": read_gpx, "health": read_health}
+
+
+def parse_time(value: str) -> datetime:
+    value = value.strip()
+    try:
+        time = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            time = datetime.strptime(value, HEALTH_TIME_FORMAT)
+        except ValueError:
+            raise ValueError(f"Invalid time {value!r}") from None
+    if time.tzinfo is not None:
+        time = time.astimezone(timezone.utc).replace(tzinfo=None)
+    return time
+
+
+def parse_record(activity, quantity, time):
+    activity = " ".join((activity or "").split())
+    if not activity:
+        raise ValueError("Missing activity")
+    if len(activity) > Category.name.type.length:
+        raise ValueError("Activity name is too long")
+    if quantity is None or time is None:
+        raise ValueError("Missing quantity or time")
+
+    quantity = round(float(quantity))
+    if not 0 <= quantity <= MAX_QUANTITY:
+        raise ValueError(f"Quantity {quantity} is out of range")
+    return activity, quantity, parse_time(time)
+
+
+def next_batch(records, size: int):
+    rows = []
+    errors = []
+    for record, activity, quantity, time in records:
+        try:
+            rows.append(parse_record(activity, quantity, time))
+        except (ValueError, TypeError, OverflowError) as e:
+            errors.append({"record": record, "detail": str(e)})
+        if len(rows) + len(errors) >= size:
+            break
+    return rows, errors
+
+
+async def import_workouts_job(job: Job, user_id: int, upload, format: str):
+    file = upload.file_object
+    job.progress.update(
+        bytes_total=upload.size,
+        bytes_read=0,
+        imported=0,
+        skipped=0,
+        categories_created=0,
+        errors=[],
+    )
+    try:
+        records = IMPORT_READERS[format](file)
+        async with async_session() as session:
+            categories_repo = CategoryRepository(session=session)
+            workouts_repo = WorkoutRepository(session=session)
+
+            query = select(Category.id, Category.name).where(Category.user_id == user_id)
+            categories = {
+                activity_key(name): category_id
+                for category_id, name in (await session.execute(query)).tuples()
+            }
+
+            while True:
+                rows, errors = await asyncio.to_thread(
+                    next_batch, records, IMPORT_BATCH_SIZE
+                )
+                if not rows and not errors:
+                    break
+
+                new_names = {}
+                for activity, _, _ in rows:
+                    key = activity_key(activity)
+                    if key not in categories:
+                        new_names.setdefault(key, activity)
+                if new_names:
+                    ids = await categories_repo.create_many(
+                        [{"user_id": user_id, "name": name} for name in new_names.values()]
+                    )
+                    categories.update(zip(new_names, ids))
+
+                await workouts_repo.create_many(
+                    [
+                        {
+                            "user_id": user_id,
+                            "category_id": categories[activity_key(activity)],
+                            "quantity": quantity,
+                            "time": time,
+                        }
+                        for activity, quantity, time in rows
+                    ]
+                )
+
+                job.progress["imported"] += len(rows)
+                job.progress["skipped"] += len(errors)
+                job.progress["categories_created"] += len(new_names)
+                job.progress["bytes_read"] = file.tell()
+                room = IMPORT_MAX_ERRORS - len(job.progress["errors"])
+                job.progress["errors"].extend(errors[: max(room, 0)])
+    finally:
+        upload.close()
+    job.progress["bytes_read"] = job.progress["bytes_total"]
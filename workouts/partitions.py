@@ -0,0 +1,147 @@
+import gzip
+import re
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+PARENT = "workoutdata"
+DEFAULT_PARTITION = f"{PARENT}_default"
+PARTITION_NAME = re.compile(rf"^{PARENT}_y(\d{{4}})m(\d{{2}})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year}m{month.month:02d}"
+
+
+class PartitionManager:
+    def __init__(self, session, shard_id: int = 0):
+        self.session = session
+        self.bind_arguments = {"shard_id": shard_id}
+
+    async def list_partitions(self) -> dict[date, str]:
+        query = text(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            """
+        )
+        partitions = {}
+        for name in (
+            await self.session.scalars(
+                query, {"parent": PARENT}, bind_arguments=self.bind_arguments
+            )
+        ).all():
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return dict(sorted(partitions.items()))
+
+    async def create_partition(self, month: date):
+        name = partition_name(month)
+        bounds = {"lower": month, "upper": add_months(month, 1)}
+        try:
+            await self.session.execute(
+                text(
+                    f"CREATE TABLE {name} "
+                    f"(LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ),
+                bind_arguments=self.bind_arguments,
+            )
+            await self.session.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                    f'WHERE "time" >= :lower AND "time" < :upper RETURNING *) '
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+                bind_arguments=self.bind_arguments,
+            )
+            await self.session.execute(
+                text(
+                    f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+                ),
+                bind_arguments=self.bind_arguments,
+            )
+            await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+        return name
+
+    async def ensure_partitions(self, months_ahead: int, today: date | None = None):
+        current = (today or date.today()).replace(day=1)
+        existing = await self.list_partitions()
+
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(await self.create_partition(month))
+        return created
+
+    async def archive_partitions(
+        self,
+        retain_months: int,
+        archive_dir: Path | None,
+        today: date | None = None,
+    ):
+        cutoff = add_months((today or date.today()).replace(day=1), -retain_months)
+        expired = {
+            month: name
+            for month, name in (await self.list_partitions()).items()
+            if month < cutoff
+        }
+
+        archived = []
+        for month, name in expired.items():
+            try:
+                await self.session.execute(
+                    text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"),
+                    bind_arguments=self.bind_arguments,
+                )
+                await self.session.commit()
+            except:
+                await self.session.rollback()
+                raise
+
+            if archive_dir is None:
+                archived.append((name, None))
+                continue
+
+            path = archive_dir / f"{name}.csv.gz"
+            await self._export(name, path)
+            try:
+                await self.session.execute(
+                    text(f"DROP TABLE {name}"), bind_arguments=self.bind_arguments
+                )
+                await self.session.commit()
+            except:
+                await self.session.rollback()
+                raise
+            archived.append((name, path))
+        return archived
+
+    async def _export(self, name: str, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = await self.session.connection(bind_arguments=self.bind_arguments)
+        raw_connection = await connection.get_raw_connection()
+
+        with gzip.open(path.with_suffix(".tmp"), "wb") as archive:
+
+            async def write(chunk: bytes):
+                archive.write(chunk)
+
+            await raw_connection.driver_connection.copy_from_table(
+                name, output=write, format="csv", header=True
+            )
+        path.with_suffix(".tmp").rename(path)
+        await self.session.commit()
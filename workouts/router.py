@@ -1,44 +1,328 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Any, Literal
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_async_session
+from config import (
+    BATCH_DELETE_MAX_IDS,
+    BATCH_GET_MAX_IDS,
+    BULK_MAX_ITEMS,
+    WORKOUT_BATCH_ENABLED,
+)
+from database import async_session, get_async_session
+from etags import collection_etag, conditional, entity_etag
+from idempotency.services import idempotent_create
+from jobs.schemas import JobAccepted
+from jobs.services import job_registry
+from models import utcnow
+from users.services import UserRepository
 
-from .schemas import WorkoutCreate, WorkoutRead
-from .services import WorkoutRepository
+from .batcher import workout_batcher
+from .export import (
+    EXPORT_EXTENSIONS,
+    EXPORT_MEDIA_TYPES,
+    columnar_response,
+    export_name,
+    export_rows,
+)
+from .imports import (
+    UploadTooLarge,
+    detect_format,
+    import_workouts_job,
+    receive_upload,
+)
+from .schemas import (
+    WorkoutBatchDelete,
+    WorkoutBatchRead,
+    WorkoutBulkCreated,
+    WorkoutBulkError,
+    WorkoutBulkResult,
+    WorkoutCreate,
+    WorkoutPage,
+    WorkoutRead,
+    naive_utc,
+)
+from .services import WorkoutRepository, decode_cursor
 
 workoutdata_router = APIRouter(prefix="/workoutsdata", tags=["workoutsdata"])
 
 
+@workoutdata_router.get("/", response_model=WorkoutPage | WorkoutBatchRead)
+async def get_workoutdata_page(
+    request: Request,
+    response: Response,
+    user_id: int | None = None,
+    category_id: int | None = None,
+    ids: list[int] | None = Query(None),
+    before: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_async_session),
+):
+    workouts_repo = WorkoutRepository(session=session)
+
+    if ids is not None:
+        if len(ids) > BATCH_GET_MAX_IDS:
+            raise HTTPException(
+                status_code=413, detail=f"At most {BATCH_GET_MAX_IDS} ids per request"
+            )
+
+        workouts = await workouts_repo.get_many(ids=ids)
+        etag = collection_etag(
+            "workoutdata", ids, [(workout.id, workout.version) for workout in workouts]
+        )
+        not_modified = conditional(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+
+        found = {workout.id for workout in workouts}
+        return WorkoutBatchRead(items=workouts, missing=sorted(set(ids) - found))
+
+    if user_id is None and category_id is None:
+        raise HTTPException(
+            status_code=400, detail="user_id or category_id is required"
+        )
+
+    try:
+        cursor = decode_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    items, next_cursor = await workouts_repo.get_page(
+        user_id=user_id, category_id=category_id, before=cursor, limit=limit
+    )
+
+    etag = collection_etag(
+        "workoutdata",
+        user_id,
+        category_id,
+        before,
+        limit,
+        [(item.id, item.version) for item in items],
+    )
+    not_modified = conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    return WorkoutPage(items=items, next_cursor=next_cursor)
+
+
+@workoutdata_router.get("/batcher")
+async def get_workoutdata_batcher_metrics():
+    return {"enabled": WORKOUT_BATCH_ENABLED, **workout_batcher.metrics.snapshot()}
+
+
+@workoutdata_router.get("/export")
+async def export_workoutdata_handler(
+    request: Request,
+    user_id: int | None = None,
+    category_id: int | None = None,
+    format: Literal["ndjson", "csv", "columnar"] = "ndjson",
+):
+    if user_id is None and category_id is None:
+        raise HTTPException(
+            status_code=400, detail="user_id or category_id is required"
+        )
+
+    if format == "columnar":
+        return await columnar_response(request, user_id, category_id)
+
+    name = export_name(user_id, category_id)
+    filename = f"workouts-{name}.{EXPORT_EXTENSIONS[format]}"
+    return StreamingResponse(
+        export_rows(format, user_id=user_id, category_id=category_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @workoutdata_router.get("/{workoutdata_id}", response_model=WorkoutRead)
 async def get_workoutdata_by_id(
-    workoutdata_id: int, session: AsyncSession = Depends(get_async_session)
+    workoutdata_id: int,
+    request: Request,
+    response: Response,
+    time: datetime | None = None,
+    session: AsyncSession = Depends(get_async_session),
 ):
     workouts_repo = WorkoutRepository(session=session)
-    return await workouts_repo.get_by_id(id=workoutdata_id)
+    workout = await workouts_repo.get_by_id(id=workoutdata_id, time=naive_utc(time))
+
+    if workout is not None:
+        not_modified = conditional(request, response, entity_etag(workout))
+        if not_modified is not None:
+            return not_modified
+
+    return workout
 
 
 @workoutdata_router.post("/", response_model=WorkoutRead)
 async def create_workoutdata_handler(
-    workout_data: WorkoutCreate, session: AsyncSession = Depends(get_async_session)
+    workout_data: WorkoutCreate,
+    response: Response,
+    idempotency_key: str | None = Header(None, max_length=255),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    workouts_repo = WorkoutRepository(session=session)
-    new_workout = await workouts_repo.create(
+    async def create(auto_commit: bool = True):
+        if WORKOUT_BATCH_ENABLED and auto_commit:
+            row = {"time": utcnow(), **workout_data.model_dump(exclude_none=True)}
+            id = await workout_batcher.submit(row)
+            return WorkoutRead(id=id, time=row["time"])
+
+        workouts_repo = WorkoutRepository(session=session)
+        return await workouts_repo.create(
+            auto_commit=auto_commit, **workout_data.model_dump(exclude_none=True)
+        )
+
+    return await idempotent_create(
+        response,
+        session,
+        key=idempotency_key,
         user_id=workout_data.user_id,
-        category_id=workout_data.category_id,
-        quantity=workout_data.quantity,
+        scope="workoutdata",
+        request=workout_data,
+        response_model=WorkoutRead,
+        create=create,
+    )
+
+
+@workoutdata_router.post("/bulk", response_model=WorkoutBulkResult)
+async def create_workoutdata_bulk_handler(
+    items: list[dict[str, Any]] = Body(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request"
+        )
+
+    workouts_repo = WorkoutRepository(session=session)
+    errors = []
+    valid = []
+
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, WorkoutCreate.model_validate(item)))
+        except ValidationError as e:
+            errors.append(
+                WorkoutBulkError(
+                    index=index, detail=e.errors(include_url=False, include_context=False)
+                )
+            )
+
+    owners = await workouts_repo.get_category_owners(
+        {workout.category_id for _, workout in valid}
+    )
+    now = utcnow()
+    rows = []
+    indexes = []
+    for index, workout in valid:
+        owner = owners.get(workout.category_id)
+        if owner is None:
+            errors.append(WorkoutBulkError(index=index, detail="Category not found"))
+        elif owner != workout.user_id:
+            errors.append(
+                WorkoutBulkError(index=index, detail="Category belongs to another user")
+            )
+        else:
+            rows.append({"time": now, **workout.model_dump(exclude_none=True)})
+            indexes.append(index)
+
+    ids = await workouts_repo.create_many(rows)
+
+    return WorkoutBulkResult(
+        created=[
+            WorkoutBulkCreated(index=index, id=id, time=row["time"])
+            for index, id, row in zip(indexes, ids, rows)
+        ],
+        errors=sorted(errors, key=lambda error: error.index),
+    )
+
+
+@workoutdata_router.post("/import", status_code=202, response_model=JobAccepted)
+async def import_workoutdata_handler(
+    request: Request,
+    user_id: int,
+    format: Literal["csv", "gpx", "health"] | None = None,
+):
+    async with async_session() as session:
+        if not await UserRepository(session=session).get_by_id(id=user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        upload = await receive_upload(request)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    format = format or detect_format(upload.file_name)
+    if format is None:
+        upload.close()
+        raise HTTPException(
+            status_code=400, detail="Unknown file type, pass format=csv|gpx|health"
+        )
+
+    job = job_registry.submit(
+        "import_workouts", import_workouts_job, user_id, upload, format
+    )
+    return JSONResponse(
+        status_code=202,
+        content=JobAccepted(job_id=job.id, status_url=f"/jobs/{job.id}").model_dump(),
     )
-    return new_workout
 
 
 @workoutdata_router.delete("/{workoutdata_id}")
 async def delete_workoutdata_handler(
-    workoutdata_id: int, session: AsyncSession = Depends(get_async_session)
+    workoutdata_id: int,
+    time: datetime | None = None,
+    session: AsyncSession = Depends(get_async_session),
 ):
     workouts_repo = WorkoutRepository(session=session)
 
-    deleted_workout = await workouts_repo.delete_by_id(id=workoutdata_id)
+    deleted_workout = await workouts_repo.delete_by_id(
+        id=workoutdata_id, time=naive_utc(time)
+    )
 
     if not deleted_workout:
-        return HTTPException(status_code=404, detail="Workout not found")
+        raise HTTPException(status_code=404, detail="Workout not found")
 
     return {f"Workout with id {deleted_workout.id}": "was deleted"}
+
+
+@workoutdata_router.delete("/", response_model=WorkoutBatchDelete)
+async def delete_workoutdata_batch_handler(
+    ids: list[int] = Query(...),
+    times: list[datetime] | None = Query(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if len(ids) > BATCH_DELETE_MAX_IDS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BATCH_DELETE_MAX_IDS} ids per request"
+        )
+    if times is not None:
+        if len(times) != len(ids):
+            raise HTTPException(
+                status_code=400, detail="times must have one entry per id"
+            )
+        times = [naive_utc(time) for time in times]
+
+    workouts_repo = WorkoutRepository(session=session)
+    deleted = {
+        workout.id
+        for workout in await workouts_repo.delete_many(ids=ids, times=times)
+    }
+
+    return WorkoutBatchDelete(
+        deleted=sorted(deleted), missing=sorted(set(ids) - deleted)
+    )
@@ -1,14 +1,74 @@
-from pydantic import BaseModel
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, Field, field_validator
+
+
+MAX_QUANTITY = 2**31 - 1
+
+
+def naive_utc(value: datetime | None):
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 class WorkoutCreate(BaseModel):
     user_id: int
     category_id: int
-    quantity: int
+    quantity: int = Field(ge=0, le=MAX_QUANTITY)
+    time: datetime | None = None
+
+    @field_validator("time")
+    @classmethod
+    def to_naive_utc(cls, value: datetime | None):
+        return naive_utc(value)
 
 
 class WorkoutRead(BaseModel):
     id: int
+    time: datetime | None = None
 
     class Config:
         from_attributes = True
+
+
+class WorkoutDetail(BaseModel):
+    id: int
+    user_id: int
+    category_id: int
+    quantity: int
+    time: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WorkoutPage(BaseModel):
+    items: list[WorkoutDetail]
+    next_cursor: str | None
+
+
+class WorkoutBulkCreated(BaseModel):
+    index: int
+    id: int
+    time: datetime
+
+
+class WorkoutBulkError(BaseModel):
+    index: int
+    detail: str | list
+
+
+class WorkoutBulkResult(BaseModel):
+    created: list[WorkoutBulkCreated]
+    errors: list[WorkoutBulkError]
+
+
+class WorkoutBatchDelete(BaseModel):
+    deleted: list[int]
+    missing: list[int]
+
+
+class WorkoutBatchRead(BaseModel):
+    items: list[WorkoutDetail]
+    missing: list[int]
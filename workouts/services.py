@@ -1,7 +1,167 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from sqlalchemy import func, select, tuple_
+
 from database import BaseRepository
-from models import WorkoutData
+from leaderboards.services import record_deltas
+from models import Category, WorkoutData, utcnow
+from stats.services import RollupRepository
+
+
+def encode_cursor(time: datetime, id: int) -> str:
+    return urlsafe_b64encode(f"{time.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    time, id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(time), int(id)
 
 
 class WorkoutRepository(BaseRepository[WorkoutData]):
     def __init__(self, session):
         super().__init__(WorkoutData, session)
+
+    async def create(self, auto_commit: bool = True, **kwargs):
+        new_workout = await super().create(auto_commit=False, **kwargs)
+        await self._apply_rollups([self._rollup_row(new_workout)], 1, auto_commit)
+        return new_workout
+
+    async def create_many(self, rows: list[dict], auto_commit: bool = True):
+        rows = [{"time": utcnow(), **row} for row in rows]
+        ids = await super().create_many(rows, auto_commit=False)
+        await self._apply_rollups(
+            [
+                (row["user_id"], row["category_id"], row["quantity"], row["time"])
+                for row in rows
+            ],
+            1,
+            auto_commit,
+        )
+        return ids
+
+    async def get_by_id(self, id: int, time: datetime | None = None):
+        if time is None:
+            return await super().get_by_id(id)
+
+        query = select(self.model).where(self.model.id == id, self.model.time == time)
+        return (await self._read(query)).scalar_one_or_none()
+
+    async def delete_by_id(
+        self, id: int, auto_commit: bool = True, time: datetime | None = None
+    ):
+        deleted = await self.delete_many(
+            [id], auto_commit=auto_commit, times=None if time is None else [time]
+        )
+        return deleted[0] if deleted else None
+
+    async def delete_many(
+        self,
+        ids: list[int],
+        auto_commit: bool = True,
+        times: list[datetime] | None = None,
+    ):
+        conditions = ()
+        if times is not None:
+            conditions = (
+                tuple_(self.model.id, self.model.time).in_(list(zip(ids, times))),
+                self.model.time.in_(times),
+            )
+        deleted_workouts = await super().delete_many(
+            ids, *conditions, auto_commit=False
+        )
+        await self._apply_rollups(
+            [self._rollup_row(workout) for workout in deleted_workouts],
+            -1,
+            auto_commit,
+        )
+        return deleted_workouts
+
+    @staticmethod
+    def _rollup_row(workout: WorkoutData):
+        return workout.user_id, workout.category_id, workout.quantity, workout.time
+
+    async def _apply_rollups(self, workouts: list, sign: int, auto_commit: bool):
+        try:
+            xids = await RollupRepository(self.session).apply(workouts, sign)
+            record_deltas(self.session, workouts, sign, xids)
+            if auto_commit:
+                await self.session.commit()
+        except:
+            await self.session.rollback()
+            raise
+
+    async def get_category_owners(self, category_ids: set[int]):
+        query = select(Category.id, Category.user_id).where(
+            Category.id.in_(category_ids)
+        )
+        return dict((await self.session.execute(query)).tuples().all())
+
+    async def get_page(
+        self,
+        user_id: int | None,
+        category_id: int | None,
+        before: tuple[datetime, int] | None,
+        limit: int,
+    ):
+        query = select(self.model)
+        if user_id is not None:
+            query = query.where(self.model.user_id == user_id)
+        if category_id is not None:
+            query = query.where(self.model.category_id == category_id)
+        if before is not None:
+            query = query.where(
+                self.model.time <= before[0],
+                tuple_(self.model.time, self.model.id) < before,
+            )
+
+        query = query.order_by(self.model.time.desc(), self.model.id.desc()).limit(
+            limit + 1
+        )
+        workouts = (await self.session.scalars(query)).all()
+
+        if len(workouts) <= limit:
+            return workouts, None
+        last = workouts[limit - 1]
+        return workouts[:limit], encode_cursor(last.time, last.id)
+
+    def _history_filter(self, query, user_id: int | None, category_id: int | None):
+        if user_id is not None:
+            query = query.where(self.model.user_id == user_id)
+        if category_id is not None:
+            query = query.where(self.model.category_id == category_id)
+        return query
+
+    async def get_history_version(
+        self, user_id: int | None = None, category_id: int | None = None
+    ):
+        query = self._history_filter(
+            select(
+                func.count(),
+                func.coalesce(func.sum(self.model.version), 0),
+                func.coalesce(
+                    func.sum(func.hashint8extended(self.model.id, self.model.version)),
+                    0,
+                ),
+            ),
+            user_id,
+            category_id,
+        )
+        count, versions, checksum = (await self.session.execute(query)).one()
+        return count, int(versions), int(checksum)
+
+    async def stream_history(
+        self,
+        *columns,
+        fetch_size: int,
+        user_id: int | None = None,
+        category_id: int | None = None,
+    ):
+        query = (
+            self._history_filter(select(*columns), user_id, category_id)
+            .order_by(self.model.time, self.model.id)
+            .execution_options(yield_per=fetch_size)
+        )
+        result = await self.session.stream(query)
+        async for partition in result.partitions():
+            yield partition